@@ -0,0 +1,151 @@
+"""Measure write latency while a poll storm hits the server.
+
+Runs the app on a threaded local server in a separate process, starts poll
+threads that hammer the chef and employee polling endpoints, and times chef
+status updates with admission control on and off.
+
+Usage: python bench_admission.py [poll_threads] [writes]
+"""
+import http.client
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EMPLOYEE_TOKEN = os.getenv("EMPLOYEE_TOKEN", "employee-access")
+CHEF_TOKEN = os.getenv("CHEF_TOKEN", "chef-access")
+ORDERS = 1000
+POLL_RETRY_AFTER_SECONDS = 2
+
+
+def request(port: int, method: str, path: str, body=None):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    start = time.perf_counter()
+    connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    return response.status, (time.perf_counter() - start) * 1000
+
+
+SERVER = """
+import logging, sys
+import order
+from werkzeug.serving import make_server
+
+logging.getLogger("werkzeug").setLevel(logging.ERROR)
+app = order.create_app()
+kitchen = order.get_kitchen(order.DEFAULT_KITCHEN_ID)
+for index in range({orders}):
+    kitchen["orders"].append({{
+        "id": kitchen["next_order_id"],
+        "kitchen_id": kitchen["id"],
+        "employee_name": f"Bench {{index % 40}}",
+        "mate_name": "",
+        "order_text": "Coffee x2, Cookies x1",
+        "voice_filename": "",
+        "order_items": [{{"name": "Coffee", "qty": 2}}, {{"name": "Cookies", "qty": 1}}],
+        "requirements": "",
+        "created_at": order.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "created_at_iso": order.now_iso(),
+        "status": "Pending",
+        "prep_minutes": None,
+        "prep_started_at": None,
+        "cancelled_at": None,
+        "pickup_at": None,
+    }})
+    kitchen["next_order_id"] += 1
+server = make_server("127.0.0.1", 0, app, threaded=True)
+print(server.server_port, flush=True)
+server.serve_forever()
+"""
+
+
+def start_server(tmp: str, orders: int, admission: bool):
+    # The server runs in its own process so client threads do not share its GIL.
+    env = dict(os.environ, DB_PATH=os.path.join(tmp, f"bench-{admission}.db"))
+    if not admission:
+        env["MAX_POLLS_IN_FLIGHT"] = env["MAX_WRITES_IN_FLIGHT"] = str(10**6)
+    process = subprocess.Popen(
+        [sys.executable, "-c", SERVER.format(orders=orders)],
+        cwd=BASE_DIR,
+        env=env,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    port = int(process.stdout.readline())
+    return process, port
+
+
+def run_scenario(port: int, poll_threads: int, writes: int, orders: int):
+    stop = threading.Event()
+    poll_statuses = {}
+    poll_lock = threading.Lock()
+    poll_paths = [
+        f"/api/chef/{CHEF_TOKEN}/orders",
+        f"/api/employee/{EMPLOYEE_TOKEN}/menu",
+    ]
+
+    def poll(index: int):
+        path = poll_paths[index % len(poll_paths)]
+        while not stop.is_set():
+            status, _ = request(port, "GET", path)
+            with poll_lock:
+                poll_statuses[status] = poll_statuses.get(status, 0) + 1
+            if status == 429:
+                # Clients honor Retry-After with jitter, as static/poll.js does.
+                stop.wait(POLL_RETRY_AFTER_SECONDS * (0.5 + random.random()))
+
+    workers = [threading.Thread(target=poll, args=(i,), daemon=True) for i in range(poll_threads)]
+    for worker in workers:
+        worker.start()
+    time.sleep(0.5)
+    latencies = []
+    statuses = ["Preparing", "Ready"]
+    for index in range(writes):
+        order_id = index % orders + 1
+        path = f"/api/chef/{CHEF_TOKEN}/orders/{order_id}/status"
+        status, elapsed = request(port, "POST", path, {"status": statuses[index % 2]})
+        assert status == 200, status
+        latencies.append(elapsed)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    return latencies, poll_statuses
+
+
+def summarize(label: str, latencies: list, poll_statuses: dict):
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    polls = ", ".join(f"{status}: {count}" for status, count in sorted(poll_statuses.items()))
+    print(
+        f"{label:<28} write p50 {statistics.median(ordered):7.2f} ms   "
+        f"p95 {p95:7.2f} ms   max {ordered[-1]:7.2f} ms   polls {polls or '-'}"
+    )
+
+
+def main():
+    poll_threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    writes = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    print(f"{writes} chef status updates, {poll_threads} polling threads, {ORDERS} orders")
+    with tempfile.TemporaryDirectory() as tmp:
+        for admission in (False, True):
+            process, port = start_server(tmp, ORDERS, admission)
+            try:
+                label = "admission" if admission else "no admission"
+                summarize(f"{label}, no polls", *run_scenario(port, 0, writes, ORDERS))
+                summarize(f"{label}, poll storm", *run_scenario(port, poll_threads, writes, ORDERS))
+            finally:
+                process.terminate()
+                process.wait()
+
+
+if __name__ == "__main__":
+    main()
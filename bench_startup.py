@@ -0,0 +1,89 @@
+"""Measure time-to-first-request for cold and preloaded (forked) workers.
+
+Usage: python bench_startup.py [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EMPLOYEE_TOKEN = os.getenv("EMPLOYEE_TOKEN", "employee-access")
+FIRST_REQUEST = f"/api/employee/{EMPLOYEE_TOKEN}/menu"
+
+COLD_WORKER = f"""
+import json, time
+start = time.perf_counter()
+import order
+imported = time.perf_counter()
+app = order.create_app()
+initialized = time.perf_counter()
+response = app.test_client().get({FIRST_REQUEST!r})
+assert response.status_code == 200, response.status_code
+done = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "init_ms": (initialized - imported) * 1000,
+    "first_request_ms": (done - initialized) * 1000,
+    "total_ms": (done - start) * 1000,
+}}))
+"""
+
+
+def run_cold_worker(db_path: str):
+    env = dict(os.environ, DB_PATH=db_path)
+    output = subprocess.check_output(
+        [sys.executable, "-c", COLD_WORKER], cwd=BASE_DIR, env=env, text=True
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_forked_workers(db_path: str, runs: int):
+    # Mirrors `gunicorn --preload`: the master imports and initializes once,
+    # then each forked worker only pays for its first request.
+    os.environ["DB_PATH"] = db_path
+    sys.path.insert(0, BASE_DIR)
+    import order
+
+    app = order.create_app()
+    timings = []
+    for _ in range(runs):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            start = time.perf_counter()
+            response = app.test_client().get(FIRST_REQUEST)
+            elapsed = (time.perf_counter() - start) * 1000
+            os.write(write_fd, json.dumps({"status": response.status_code, "first_request_ms": elapsed}).encode())
+            os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            result = json.loads(pipe.read())
+        os.waitpid(pid, 0)
+        timings.append(result["first_request_ms"])
+    return timings
+
+
+def summarize(label: str, values: list):
+    print(f"{label:<28} median {statistics.median(values):8.2f} ms   max {max(values):8.2f} ms")
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    with tempfile.TemporaryDirectory() as tmp:
+        cold = [run_cold_worker(os.path.join(tmp, f"cold-{i}.db")) for i in range(runs)]
+        print(f"Cold workers ({runs} runs, fresh interpreter + empty database)")
+        for key in ("import_ms", "init_ms", "first_request_ms", "total_ms"):
+            summarize(f"  {key}", [item[key] for item in cold])
+        if hasattr(os, "fork"):
+            forked = run_forked_workers(os.path.join(tmp, "preload.db"), runs)
+            print(f"Preloaded workers ({runs} forks of an initialized master)")
+            summarize("  first_request_ms", forked)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,18 @@
 from datetime import datetime, timedelta, timezone
 import os
 
+import copy
+import heapq
 import json
+import re
 import sqlite3
+import threading
+import time
 from zoneinfo import ZoneInfo
 from uuid import uuid4
 
-from flask import Flask, jsonify, redirect, render_template, request, send_from_directory, session, url_for
+from flask import Flask, g, jsonify, redirect, render_template, request, send_from_directory, session, url_for
+from markupsafe import Markup
 from werkzeug.utils import secure_filename
 
 app = Flask(__name__, template_folder="views", static_folder="static")
@@ -16,29 +22,17 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DEFAULT_MENU_ASSETS_DIR = os.path.join(BASE_DIR, "static", "menu")
 LEGACY_MENU_ASSETS_DIR = r"C:\Users\Admin\.cursor\projects\c-Users-Admin-OneDrive-Documents-Innov\assets"
 VOICE_UPLOAD_DIR = os.path.join(BASE_DIR, "static", "voice")
-DB_PATH = os.path.join(BASE_DIR, "data.db")
+DB_PATH = os.getenv("DB_PATH", os.path.join(BASE_DIR, "data.db"))
 IST_TZ = ZoneInfo("Asia/Kolkata")
 MENU_ASSETS_DIR = os.getenv("MENU_ASSETS_DIR")
-if not MENU_ASSETS_DIR:
-    MENU_ASSETS_DIR = (
-        DEFAULT_MENU_ASSETS_DIR
-        if os.path.isdir(DEFAULT_MENU_ASSETS_DIR)
-        else LEGACY_MENU_ASSETS_DIR
-    )
-os.makedirs(VOICE_UPLOAD_DIR, exist_ok=True)
 
-# In-memory store for demo purposes. Replace with DB in production.
-ORDERS = []
-PRESETS = []
-LUNCH_READY = {"is_ready": False, "updated_at": None}
-RING_EVENTS = []
-RING_EVENTS = []
+# Base menu that every kitchen starts from.
 MENU = {
     "Snacks": [
         {"name": "Cookies", "image": "/menu-images/cookies.png"},
-        {"name": "Chocolates", "image": "/menu-images/chocolates.png"},
+        {"name": "Chocolates", "image": "/menu-images/chocolates.png", "aliases": ["chocolate bar"]},
         {"name": "Wafers", "image": "/menu-images/wafers.png"},
-        {"name": "Chips", "image": "/menu-images/chips.png"},
+        {"name": "Chips", "image": "/menu-images/chips.png", "aliases": ["crisps"]},
         {"name": "Nuts", "image": "/menu-images/nuts.png"},
         {"name": "Dates", "image": "/menu-images/dates.png"},
     ],
@@ -46,16 +40,16 @@ MENU = {
         {"name": "Pasta", "image": "/menu-images/pasta.png"},
         {"name": "Noodles", "image": "/menu-images/noodles.png"},
         {"name": "Fried Rice", "image": "/menu-images/fried_rice.png"},
-        {"name": "BBQ Chicken", "image": "/menu-images/bbq_chicken.png"},
-        {"name": "Gobi Manchurian", "image": "/menu-images/gobi_manchurian.png"},
-        {"name": "Chapathi", "image": "/menu-images/chapathi.png"},
-        {"name": "Sandwich", "image": "/menu-images/sandwich.png"},
+        {"name": "BBQ Chicken", "image": "/menu-images/bbq_chicken.png", "aliases": ["barbecue chicken"]},
+        {"name": "Gobi Manchurian", "image": "/menu-images/gobi_manchurian.png", "aliases": ["gobi"]},
+        {"name": "Chapathi", "image": "/menu-images/chapathi.png", "aliases": ["chapati", "roti"]},
+        {"name": "Sandwich", "image": "/menu-images/sandwich.png", "aliases": ["sandwitch"]},
         {"name": "Idli", "image": "/menu-images/idli.png"},
         {"name": "Dosa", "image": "/menu-images/dosa.png"},
     ],
     "Drinks": [
-        {"name": "Tea", "image": "/menu-images/tea.png"},
-        {"name": "Coffee", "image": "/menu-images/coffee.png"},
+        {"name": "Tea", "image": "/menu-images/tea.png", "aliases": ["chai"]},
+        {"name": "Coffee", "image": "/menu-images/coffee.png", "aliases": ["filter coffee", "kaapi"]},
         {"name": "Boost", "image": "/menu-images/boost.png"},
         {"name": "Horlicks", "image": "/menu-images/horlicks.png"},
         {"name": "Juice", "image": "/menu-images/juice.png"},
@@ -63,50 +57,386 @@ MENU = {
     ],
 }
 
-# Track menu availability by item name (lowercased).
-MENU_AVAILABILITY = {}
+# Free-text and preset orders are parsed into order_items with a word trie
+# compiled from menu names and aliases, e.g. "2 coffee" or "tea x3".
+MENU_MATCH_END = "$"
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+MAX_ITEM_QTY = 50
+# A name right after one of these ("sandwich without chips") is not ordered.
+NEGATION_WORDS = {"no", "not", "without", "except", "minus", "skip"}
+NEGATION_FILLERS = {"any", "the", "extra"}
+
+# Each employee's most frequent (item, qty) combos, kept in memory and in
+# data.db so they outlive the 12-hour order window.
+FAVORITES_LIMIT = 5
 
 # Simple access separation via private URLs.
 EMPLOYEE_TOKEN = os.getenv("EMPLOYEE_TOKEN", "employee-access")
 CHEF_TOKEN = os.getenv("CHEF_TOKEN", "chef-access")
 
+# Pre-orders are booked into fixed pickup slots during kitchen hours (IST) and
+# released to the chef queue ahead of pickup by the estimated prep time.
+KITCHEN_OPEN_TIME = "08:00"
+KITCHEN_CLOSE_TIME = "19:30"
+SLOT_MINUTES = 15
+SLOT_CAPACITY = int(os.getenv("SLOT_CAPACITY", "8"))
+SCHEDULE_BUFFER_MINUTES = 5
+DEFAULT_PREP_MINUTES = 10
+CATEGORY_PREP_MINUTES = {"Snacks": 2, "Drinks": 5, "Mains": 20}
+
+# Clients send an Idempotency-Key with order, ring and cancel submissions so
+# retries (including offline replays from the service worker) are deduplicated.
+IDEMPOTENCY_TTL_SECONDS = 12 * 60 * 60
+
+# Per-order card fragments are cached per kitchen (least recently used first
+# out), keyed by the order version that every mutation bumps through
+# touch_order(). Whole pages keep one entry per page and are dropped on change.
+FRAGMENT_CACHE_LIMIT = 1000
+
+# Admission control: GET /api/ polls and POST writes are bounded separately
+# per kitchen. Polls yield a slot to every write in flight, and excess polls
+# get a cheap 429 so clients back off while orders and chef updates go through.
+# THREADS is gunicorn's --threads; more writes than threads would only queue
+# inside the server, so the write cap defaults to it.
+THREADS = int(os.getenv("THREADS", "8"))
+MAX_POLLS_IN_FLIGHT = int(os.getenv("MAX_POLLS_IN_FLIGHT", "2"))
+MAX_WRITES_IN_FLIGHT = int(os.getenv("MAX_WRITES_IN_FLIGHT", str(THREADS)))
+POLL_RETRY_AFTER_SECONDS = 2
+WRITE_RETRY_AFTER_SECONDS = 1
+# kitchen id -> {"poll": n, "write": n}; None for routes outside a kitchen.
+IN_FLIGHT = {}
+IN_FLIGHT_LOCK = threading.Lock()
+
+# Each kitchen (pantry) owns its own orders, menu, availability, rings and
+# lunch state. KITCHENS="main:chef-access,north:north-chef" configures the
+# kitchens and their chef tokens; SERVED_KITCHENS="north" limits a process to a
+# subset so kitchens can be placed on separate gunicorn instances.
+DEFAULT_KITCHEN_ID = "main"
+KITCHEN_ID_PATTERN = re.compile(r"^[a-z0-9_]+$")
+# In-memory store for demo purposes. Replace with DB in production.
+KITCHENS = {}
+
 
 def normalize_item_name(name: str) -> str:
     return str(name or "").strip().lower()
 
 
-def init_menu_availability():
-    for items in MENU.values():
+def parse_kitchen_config(value: str):
+    kitchens = {}
+    for entry in str(value or "").split(","):
+        kitchen_id, _, chef_token = entry.strip().partition(":")
+        kitchen_id = kitchen_id.strip().lower()
+        if not KITCHEN_ID_PATTERN.match(kitchen_id):
+            continue
+        if not chef_token.strip():
+            chef_token = CHEF_TOKEN if kitchen_id == DEFAULT_KITCHEN_ID else f"{kitchen_id}-{CHEF_TOKEN}"
+        kitchens[kitchen_id] = chef_token.strip()
+    if DEFAULT_KITCHEN_ID not in kitchens:
+        kitchens[DEFAULT_KITCHEN_ID] = CHEF_TOKEN
+    return kitchens
+
+
+def load_kitchen_menus(path: str):
+    # KITCHEN_MENUS_FILE is a JSON object of kitchen id -> menu, in the same
+    # {"Category": [{"name", "image", "aliases"}]} shape as MENU.
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as handle:
+        data = json.load(handle)
+    menus = {}
+    for kitchen_id, menu in (data or {}).items():
+        if not isinstance(menu, dict):
+            continue
+        menus[str(kitchen_id).strip().lower()] = {
+            str(category): [
+                entry for entry in entries if isinstance(entry, dict) and entry.get("name")
+            ]
+            for category, entries in menu.items()
+            if isinstance(entries, list)
+        }
+    return menus
+
+
+def new_kitchen_state(kitchen_id: str, chef_token: str, menu: dict = None):
+    return {
+        "id": kitchen_id,
+        "chef_token": chef_token,
+        "menu": copy.deepcopy(menu or MENU),
+        # Track menu availability by item name (lowercased).
+        "menu_availability": {},
+        # Word trie over menu names and aliases, see init_menu_matcher().
+        "menu_matcher": {},
+        "orders": [],
+        "presets": [],
+        "ring_events": [],
+        "lunch_ready": {"is_ready": False, "updated_at": None},
+        # Heap of (release_at_iso, order_id) plus the scheduled orders by id.
+        "scheduled_orders": [],
+        "scheduled_by_id": {},
+        "slot_counts": {},
+        # (scope, key) -> {"expires_at", "result"}, in expiry order.
+        "idempotency_keys": {},
+        "orders_version": 0,
+        "employee_versions": {},
+        "fragment_cache": {},
+        # page slot -> (cache key, html); cleared by touch_order().
+        "page_cache": {},
+        # Per-endpoint request timings for this kitchen's routes.
+        "route_timings": {},
+        # employee key -> {"combos": {combo_key: favorite}, "top": [favorite]}
+        "favorites": {},
+        # Guards every read-modify-write of this kitchen's state; requests are
+        # served by several threads. Reentrant so helpers can nest.
+        "lock": threading.RLock(),
+        "next_order_id": 1,
+        "next_preset_id": 1,
+    }
+
+
+def init_kitchens():
+    served = {
+        item.strip().lower()
+        for item in os.getenv("SERVED_KITCHENS", "").split(",")
+        if item.strip()
+    }
+    menus = load_kitchen_menus(os.getenv("KITCHEN_MENUS_FILE", ""))
+    for kitchen_id, chef_token in parse_kitchen_config(os.getenv("KITCHENS", "")).items():
+        if served and kitchen_id not in served:
+            continue
+        if kitchen_id not in KITCHENS:
+            kitchen = new_kitchen_state(kitchen_id, chef_token, menus.get(kitchen_id))
+            init_menu_availability(kitchen)
+            init_menu_matcher(kitchen)
+            KITCHENS[kitchen_id] = kitchen
+
+
+def get_kitchen(kitchen_id: str):
+    init_app_state()
+    return KITCHENS.get(kitchen_id)
+
+
+def kitchen_prefix(kitchen_id: str) -> str:
+    if kitchen_id == DEFAULT_KITCHEN_ID:
+        return ""
+    return f"/kitchens/{kitchen_id}"
+
+
+def kitchen_get(rule: str):
+    return kitchen_route(rule, ["GET"])
+
+
+def kitchen_post(rule: str):
+    return kitchen_route(rule, ["POST"])
+
+
+def kitchen_route(rule: str, methods: list):
+    # Register the legacy path for the default kitchen plus a kitchen-scoped path.
+    def decorator(view):
+        app.add_url_rule(
+            rule,
+            view_func=view,
+            methods=methods,
+            defaults={"kitchen_id": DEFAULT_KITCHEN_ID},
+        )
+        app.add_url_rule(f"/kitchens/<kitchen_id>{rule}", view_func=view, methods=methods)
+        return view
+
+    return decorator
+
+
+def init_menu_availability(kitchen: dict):
+    availability = kitchen["menu_availability"]
+    for items in kitchen["menu"].values():
         for item in items:
             key = normalize_item_name(item.get("name", ""))
-            if key and key not in MENU_AVAILABILITY:
-                MENU_AVAILABILITY[key] = True
+            if key and key not in availability:
+                availability[key] = True
+
+
+def tokenize_order_text(text: str):
+    return re.findall(r"[a-z]+|\d+", str(text or "").lower())
+
+
+def menu_name_variants(name: str):
+    tokens = tokenize_order_text(name)
+    if not tokens:
+        return []
+    variants = [tokens]
+    last = tokens[-1]
+    # Accept simple singular/plural forms ("cookie", "dosas", "sandwiches").
+    if last.endswith("es") and last[:-2].endswith(("ch", "sh", "x")):
+        variants.append(tokens[:-1] + [last[:-2]])
+    elif last.endswith("s"):
+        variants.append(tokens[:-1] + [last[:-1]])
+    elif last.endswith(("ch", "sh", "x")):
+        variants.append(tokens[:-1] + [last + "es"])
+    else:
+        variants.append(tokens[:-1] + [last + "s"])
+    return variants
 
 
-init_menu_availability()
+def init_menu_matcher(kitchen: dict):
+    # Call again whenever the kitchen menu changes.
+    matcher = {}
+    for items in kitchen["menu"].values():
+        for item in items:
+            name = item.get("name", "")
+            for label in [name, *item.get("aliases", [])]:
+                for tokens in menu_name_variants(label):
+                    node = matcher
+                    for token in tokens:
+                        node = node.setdefault(token, {})
+                    node.setdefault(MENU_MATCH_END, name)
+    kitchen["menu_matcher"] = matcher
+
+
+def parse_item_qty(token: str):
+    if token.isdigit():
+        qty = int(token)
+    else:
+        qty = NUMBER_WORDS.get(token, 0)
+    return qty if 0 < qty <= MAX_ITEM_QTY else None
+
+
+def is_negated(tokens: list, index: int, consumed: int) -> bool:
+    previous = index - 1
+    if previous >= consumed and tokens[previous] in NEGATION_FILLERS:
+        previous -= 1
+    return previous >= consumed and tokens[previous] in NEGATION_WORDS
+
+
+def match_menu_items(kitchen: dict, text: str):
+    matcher = kitchen["menu_matcher"]
+    tokens = tokenize_order_text(text)
+    quantities = {}
+    consumed = 0
+    index = 0
+    while index < len(tokens):
+        # Longest menu name starting at this token.
+        node = matcher
+        match = None
+        cursor = index
+        while cursor < len(tokens) and tokens[cursor] in node:
+            node = node[tokens[cursor]]
+            cursor += 1
+            if MENU_MATCH_END in node:
+                match = (node[MENU_MATCH_END], cursor)
+        if not match:
+            index += 1
+            continue
+        name, end = match
+        if is_negated(tokens, index, consumed):
+            consumed = end
+            index = end
+            continue
+        qty = None
+        # Quantity before the name: "2 coffee", "2 x coffee", "two coffee".
+        if index - 1 >= consumed:
+            qty = parse_item_qty(tokens[index - 1])
+            if qty is None and index - 2 >= consumed and tokens[index - 1] == "x":
+                qty = parse_item_qty(tokens[index - 2])
+        # Quantity after the name: "coffee x2", "coffee x 2".
+        if qty is None and end + 1 < len(tokens) and tokens[end] == "x":
+            qty = parse_item_qty(tokens[end + 1])
+            if qty is not None:
+                end += 2
+        quantities[name] = quantities.get(name, 0) + (qty or 1)
+        consumed = end
+        index = end
+    return [{"name": name, "qty": qty} for name, qty in quantities.items()]
+
+
+def resolve_order_items(kitchen: dict, order_items: list, order_text: str):
+    # Cart entries that are not menu names (e.g. a preset's text) are parsed
+    # like free text; entries with no menu match are kept as written. Typed
+    # order text only adds items the cart lacks, since it is often a summary
+    # of the cart itself.
+    resolved = {}
+    for item in order_items:
+        matched = match_menu_items(kitchen, item["name"])
+        if not matched:
+            matched = [{"name": item["name"], "qty": 1}]
+        for entry in matched:
+            resolved[entry["name"]] = resolved.get(entry["name"], 0) + entry["qty"] * item["qty"]
+    if order_text:
+        for entry in match_menu_items(kitchen, order_text):
+            if entry["name"] not in resolved:
+                resolved[entry["name"]] = entry["qty"]
+    return [{"name": name, "qty": qty} for name, qty in resolved.items()]
+
+
+def find_unavailable_items(kitchen: dict, order_items: list):
+    availability = kitchen["menu_availability"]
+    return [
+        item["name"]
+        for item in order_items
+        if not availability.get(normalize_item_name(item["name"]), True)
+    ]
+
 
-def prune_orders():
+def prune_orders(kitchen: dict):
+    release_scheduled_orders(kitchen)
+    orders = kitchen["orders"]
     cutoff = datetime.now(timezone.utc) - timedelta(hours=12)
-    kept = []
-    for order in ORDERS:
-        created_iso = order.get("created_at_iso")
-        created_at = None
-        if created_iso:
-            try:
-                created_at = datetime.fromisoformat(created_iso)
-            except ValueError:
-                created_at = None
-        if not created_at:
-            try:
-                created_at = datetime.strptime(order.get("created_at", ""), "%Y-%m-%d %H:%M:%S")
-            except ValueError:
-                created_at = datetime.now(timezone.utc)
-        if created_at.tzinfo is None:
-            created_at = created_at.replace(tzinfo=timezone.utc)
-        if created_at >= cutoff:
-            kept.append(order)
-    ORDERS.clear()
-    ORDERS.extend(kept)
+    with kitchen["lock"]:
+        expired = [order for order in orders if get_order_created_at(order) < cutoff]
+    if not expired:
+        return
+    # Archive outside the lock; orders placed meanwhile are kept by the swap
+    # below, which only removes the orders that were archived.
+    try:
+        archive_orders(kitchen["id"], expired)
+    except sqlite3.Error:
+        # Keep expired orders in memory so the next prune retries the archive.
+        return
+    archived = {id(order) for order in expired}
+    with kitchen["lock"]:
+        orders[:] = [order for order in orders if id(order) not in archived]
+        for order in expired:
+            touch_order(kitchen, order)
+
+
+def touch_order(kitchen: dict, order: dict):
+    with kitchen["lock"]:
+        order["version"] = order.get("version", 0) + 1
+        kitchen["orders_version"] += 1
+        employee_name = order.get("employee_name", "")
+        versions = kitchen["employee_versions"]
+        versions[employee_name] = versions.get(employee_name, 0) + 1
+        kitchen["page_cache"].clear()
+
+
+def get_cached_fragment(kitchen: dict, key: tuple, render):
+    cache = kitchen["fragment_cache"]
+    with kitchen["lock"]:
+        html = cache.pop(key, None)
+        if html is not None:
+            # Re-insert so the dict stays in least recently used order.
+            cache[key] = html
+            return html, True
+    html = Markup(render())
+    with kitchen["lock"]:
+        cache[key] = html
+        while len(cache) > FRAGMENT_CACHE_LIMIT:
+            del cache[next(iter(cache))]
+    return html, False
+
+
+def get_cached_page(kitchen: dict, slot: tuple, key: tuple, render):
+    # One entry per page: a newer key replaces the old render instead of
+    # piling up next to it.
+    cache = kitchen["page_cache"]
+    with kitchen["lock"]:
+        entry = cache.get(slot)
+    if entry and entry[0] == key:
+        return entry[1], True
+    html = Markup(render())
+    with kitchen["lock"]:
+        cache[slot] = (key, html)
+    return html, False
 
 
 def get_order_created_at(order: dict):
@@ -132,18 +462,24 @@ def filter_recent_orders(orders: list, hours: int):
     cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
     return [order for order in orders if get_order_created_at(order) >= cutoff]
 
-def get_smart_eta_minutes():
+def get_order_prep_minutes(order: dict):
+    started_at = order.get("prep_started_at")
+    finished_at = order.get("ready_at") or order.get("delivered_at")
+    if not started_at or not finished_at:
+        return None
+    try:
+        start = datetime.fromisoformat(started_at)
+        end = datetime.fromisoformat(finished_at)
+    except ValueError:
+        return None
+    return max(1, int(round((end - start).total_seconds() / 60)))
+
+
+def get_smart_eta_minutes(kitchen: dict):
     durations = []
-    for order in reversed(ORDERS):
-        started_at = order.get("prep_started_at")
-        finished_at = order.get("ready_at") or order.get("delivered_at")
-        if started_at and finished_at:
-            try:
-                start = datetime.fromisoformat(started_at)
-                end = datetime.fromisoformat(finished_at)
-            except ValueError:
-                continue
-            minutes = max(1, int(round((end - start).total_seconds() / 60)))
+    for order in reversed(kitchen["orders"]):
+        minutes = get_order_prep_minutes(order)
+        if minutes is not None:
             durations.append(minutes)
         if len(durations) >= 10:
             break
@@ -162,9 +498,171 @@ def now_ist():
     return datetime.now(IST_TZ)
 
 
+def parse_clock(value: str):
+    return datetime.strptime(value, "%H:%M").time()
+
+
 def is_sleeping_now():
     now = now_ist().time()
-    return now >= datetime.strptime("19:30", "%H:%M").time()
+    return now >= parse_clock(KITCHEN_CLOSE_TIME)
+
+
+def get_pickup_slot_starts(now: datetime):
+    # Slots for the rest of today and all of tomorrow, at least one slot ahead.
+    earliest = now + timedelta(minutes=SLOT_MINUTES)
+    opens = parse_clock(KITCHEN_OPEN_TIME)
+    closes = parse_clock(KITCHEN_CLOSE_TIME)
+    slots = []
+    for offset in (0, 1):
+        day = now.date() + timedelta(days=offset)
+        slot = datetime.combine(day, opens, tzinfo=IST_TZ)
+        end = datetime.combine(day, closes, tzinfo=IST_TZ)
+        while slot < end:
+            if slot >= earliest:
+                slots.append(slot)
+            slot += timedelta(minutes=SLOT_MINUTES)
+    return slots
+
+
+def get_pickup_slots(kitchen: dict):
+    now = now_ist()
+    counts = kitchen["slot_counts"]
+    slots = []
+    for slot in get_pickup_slot_starts(now):
+        key = slot.isoformat()
+        day_label = "Today" if slot.date() == now.date() else "Tomorrow"
+        slots.append(
+            {
+                "slot": key,
+                "label": f"{day_label} {slot.strftime('%I:%M %p').lstrip('0')}",
+                "remaining": max(0, SLOT_CAPACITY - counts.get(key, 0)),
+            }
+        )
+    return slots
+
+
+def parse_pickup_slot(value: str):
+    try:
+        slot = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if slot.tzinfo is None:
+        slot = slot.replace(tzinfo=IST_TZ)
+    slot = slot.astimezone(IST_TZ)
+    if slot not in get_pickup_slot_starts(now_ist()):
+        return None
+    return slot
+
+
+def estimate_prep_minutes(kitchen: dict, order_items: list):
+    categories = {}
+    for category, entries in kitchen["menu"].items():
+        for entry in entries:
+            categories[normalize_item_name(entry.get("name", ""))] = category
+    estimates = [
+        CATEGORY_PREP_MINUTES.get(
+            categories.get(normalize_item_name(item.get("name", ""))), DEFAULT_PREP_MINUTES
+        )
+        for item in order_items
+    ]
+    return max(estimates) if estimates else DEFAULT_PREP_MINUTES
+
+
+def reserve_pickup_slot(kitchen: dict, slot_key: str) -> bool:
+    with kitchen["lock"]:
+        count = kitchen["slot_counts"].get(slot_key, 0)
+        if count >= SLOT_CAPACITY:
+            return False
+        kitchen["slot_counts"][slot_key] = count + 1
+        return True
+
+
+def release_pickup_slot(kitchen: dict, slot_key: str):
+    with kitchen["lock"]:
+        count = kitchen["slot_counts"].get(slot_key, 0) - 1
+        if count > 0:
+            kitchen["slot_counts"][slot_key] = count
+        else:
+            kitchen["slot_counts"].pop(slot_key, None)
+
+
+def schedule_order(kitchen: dict, order: dict):
+    with kitchen["lock"]:
+        heapq.heappush(kitchen["scheduled_orders"], (order["release_at_iso"], order["id"]))
+        kitchen["scheduled_by_id"][order["id"]] = order
+
+
+def release_scheduled_orders(kitchen: dict):
+    heap = kitchen["scheduled_orders"]
+    now = now_iso()
+    if not heap or heap[0][0] > now:
+        return
+    with kitchen["lock"]:
+        while heap and heap[0][0] <= now:
+            _, order_id = heapq.heappop(heap)
+            order = kitchen["scheduled_by_id"].pop(order_id, None)
+            if not order or order.get("status") != "Scheduled":
+                continue
+            # The chef queue and pruning work off created_at, so a released
+            # pre-order enters the queue as a fresh order.
+            order["status"] = "Pending"
+            order["created_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            order["created_at_iso"] = now
+            touch_order(kitchen, order)
+            kitchen["orders"].append(order)
+        current_slot = now_ist().isoformat()
+        for key in [key for key in kitchen["slot_counts"] if key < current_slot]:
+            del kitchen["slot_counts"][key]
+
+
+def find_order(kitchen: dict, order_id: int):
+    order = next((item for item in kitchen["orders"] if item["id"] == order_id), None)
+    return order or kitchen["scheduled_by_id"].get(order_id)
+
+
+def get_idempotency_key() -> str:
+    key = request.headers.get("Idempotency-Key") or request.form.get("idempotency_key", "")
+    return str(key).strip()[:128]
+
+
+def prune_idempotency_keys(kitchen: dict):
+    keys = kitchen["idempotency_keys"]
+    now = time.time()
+    while keys:
+        oldest = next(iter(keys))
+        if keys[oldest]["expires_at"] > now:
+            break
+        del keys[oldest]
+
+
+# Callers hold kitchen["lock"] across the lookup and the matching remember so
+# concurrent retries of one request cannot both act.
+def get_idempotent_result(kitchen: dict, scope: str, key: str):
+    if not key:
+        return None
+    with kitchen["lock"]:
+        prune_idempotency_keys(kitchen)
+        entry = kitchen["idempotency_keys"].get((scope, key))
+    return entry["result"] if entry else None
+
+
+def remember_idempotent_result(kitchen: dict, scope: str, key: str, result):
+    if not key:
+        return
+    with kitchen["lock"]:
+        kitchen["idempotency_keys"][(scope, key)] = {
+            "expires_at": time.time() + IDEMPOTENCY_TTL_SECONDS,
+            "result": result,
+        }
+
+
+def get_employee_visible_orders(kitchen: dict):
+    return kitchen["orders"] + list(kitchen["scheduled_by_id"].values())
+
+
+def order_queue_key(order: dict):
+    # Released pre-orders keep their original id, so queue by arrival time.
+    return (get_order_created_at(order), order.get("id", 0))
 
 
 def get_db():
@@ -173,6 +671,35 @@ def get_db():
     return conn
 
 
+def migrate_lunch_checkins(conn):
+    # Check-ins recorded before kitchens existed belong to the main kitchen.
+    # The unique key changes too, so the table is rebuilt rather than altered.
+    columns = [row["name"] for row in conn.execute("PRAGMA table_info(lunch_checkins)")]
+    if "kitchen_id" in columns:
+        return
+    conn.execute("ALTER TABLE lunch_checkins RENAME TO lunch_checkins_old")
+    conn.execute(
+        """
+        CREATE TABLE lunch_checkins (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          kitchen_id TEXT NOT NULL DEFAULT 'main',
+          employee_name TEXT NOT NULL,
+          checked_at_iso TEXT NOT NULL,
+          checked_date TEXT NOT NULL,
+          UNIQUE(kitchen_id, employee_name, checked_date)
+        )
+        """
+    )
+    conn.execute(
+        """
+        INSERT INTO lunch_checkins (kitchen_id, employee_name, checked_at_iso, checked_date)
+        SELECT ?, employee_name, checked_at_iso, checked_date FROM lunch_checkins_old
+        """,
+        (DEFAULT_KITCHEN_ID,),
+    )
+    conn.execute("DROP TABLE lunch_checkins_old")
+
+
 def init_db():
     conn = get_db()
     try:
@@ -180,13 +707,15 @@ def init_db():
             """
             CREATE TABLE IF NOT EXISTS lunch_checkins (
               id INTEGER PRIMARY KEY AUTOINCREMENT,
+              kitchen_id TEXT NOT NULL DEFAULT 'main',
               employee_name TEXT NOT NULL,
               checked_at_iso TEXT NOT NULL,
               checked_date TEXT NOT NULL,
-              UNIQUE(employee_name, checked_date)
+              UNIQUE(kitchen_id, employee_name, checked_date)
             )
             """
         )
+        migrate_lunch_checkins(conn)
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS meta (
@@ -195,41 +724,269 @@ def init_db():
             )
             """
         )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS order_item_hourly (
+              kitchen_id TEXT NOT NULL,
+              day TEXT NOT NULL,
+              hour INTEGER NOT NULL,
+              item_name TEXT NOT NULL,
+              qty INTEGER NOT NULL DEFAULT 0,
+              PRIMARY KEY(kitchen_id, day, hour, item_name)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS order_prep_daily (
+              kitchen_id TEXT NOT NULL,
+              day TEXT NOT NULL,
+              minutes INTEGER NOT NULL,
+              count INTEGER NOT NULL DEFAULT 0,
+              PRIMARY KEY(kitchen_id, day, minutes)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS employee_favorites (
+              kitchen_id TEXT NOT NULL,
+              employee_key TEXT NOT NULL,
+              combo_key TEXT NOT NULL,
+              order_items_json TEXT NOT NULL,
+              count INTEGER NOT NULL DEFAULT 0,
+              last_ordered_iso TEXT NOT NULL,
+              PRIMARY KEY(kitchen_id, employee_key, combo_key)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS order_employee_daily (
+              kitchen_id TEXT NOT NULL,
+              day TEXT NOT NULL,
+              employee_name TEXT NOT NULL,
+              orders INTEGER NOT NULL DEFAULT 0,
+              PRIMARY KEY(kitchen_id, day, employee_name)
+            )
+            """
+        )
         conn.commit()
     finally:
         conn.close()
 
 
-init_db()
+def get_favorite_combo(order_items: list):
+    items = sorted(
+        ({"name": item["name"], "qty": item["qty"]} for item in order_items),
+        key=lambda item: normalize_item_name(item["name"]),
+    )
+    combo_key = "|".join(f"{normalize_item_name(item['name'])}:{item['qty']}" for item in items)
+    return combo_key, items
 
 
-def prune_rings():
-    cutoff = datetime.now(timezone.utc) - timedelta(hours=12)
-    kept = []
-    for ring in RING_EVENTS:
-        created_at = ring.get("created_at_iso")
-        if created_at:
-            try:
-                ring_time = datetime.fromisoformat(created_at)
-            except ValueError:
-                ring_time = datetime.now(timezone.utc)
+def favorite_rank(favorite: dict):
+    return (favorite["count"], favorite["last_ordered_iso"])
+
+
+def load_employee_favorites(kitchen: dict, employee_key: str):
+    favorites = kitchen["favorites"].get(employee_key)
+    if favorites is not None:
+        return favorites
+    combos = {}
+    conn = get_db()
+    try:
+        rows = conn.execute(
+            """
+            SELECT combo_key, order_items_json, count, last_ordered_iso
+            FROM employee_favorites
+            WHERE kitchen_id = ? AND employee_key = ?
+            """,
+            (kitchen["id"], employee_key),
+        ).fetchall()
+        for row in rows:
+            combos[row["combo_key"]] = {
+                "order_items": json.loads(row["order_items_json"]),
+                "count": row["count"],
+                "last_ordered_iso": row["last_ordered_iso"],
+            }
+    except sqlite3.Error:
+        combos = {}
+    finally:
+        conn.close()
+    top = sorted(combos.values(), key=favorite_rank, reverse=True)[:FAVORITES_LIMIT]
+    with kitchen["lock"]:
+        return kitchen["favorites"].setdefault(employee_key, {"combos": combos, "top": top})
+
+
+def record_favorite(kitchen: dict, employee_name: str, order_items: list):
+    employee_key = employee_name.strip().lower()
+    if not employee_key or not order_items:
+        return
+    combo_key, items = get_favorite_combo(order_items)
+    favorites = load_employee_favorites(kitchen, employee_key)
+    ordered_at = now_iso()
+    with kitchen["lock"]:
+        favorite = favorites["combos"].get(combo_key)
+        if favorite is None:
+            favorite = {"order_items": items, "count": 0, "last_ordered_iso": ordered_at}
+            favorites["combos"][combo_key] = favorite
+        favorite["count"] += 1
+        favorite["last_ordered_iso"] = ordered_at
+        # Counts only grow, so a combo can only enter the top list by
+        # overtaking its last entry; the list never needs a full rescan.
+        top = favorites["top"]
+        if favorite not in top:
+            top.append(favorite)
+        top.sort(key=favorite_rank, reverse=True)
+        del top[FAVORITES_LIMIT:]
+    conn = get_db()
+    try:
+        conn.execute(
+            """
+            INSERT INTO employee_favorites (
+              kitchen_id, employee_key, combo_key, order_items_json, count, last_ordered_iso
+            ) VALUES (?, ?, ?, ?, 1, ?)
+            ON CONFLICT(kitchen_id, employee_key, combo_key)
+            DO UPDATE SET count = count + 1, last_ordered_iso = excluded.last_ordered_iso
+            """,
+            (kitchen["id"], employee_key, combo_key, json.dumps(items), ordered_at),
+        )
+        conn.commit()
+    except sqlite3.Error:
+        # The in-memory index still has the order; it is rebuilt from the
+        # database on the next restart.
+        pass
+    finally:
+        conn.close()
+
+
+# Filesystem and schema setup runs once per process, on first use rather than
+# at import. With `gunicorn --preload "order:create_app()"` it runs in the
+# master and forked workers inherit the initialized state.
+APP_INITIALIZED = False
+APP_INIT_LOCK = threading.Lock()
+
+
+def init_app_state():
+    global APP_INITIALIZED, MENU_ASSETS_DIR
+    if APP_INITIALIZED:
+        return
+    with APP_INIT_LOCK:
+        if APP_INITIALIZED:
+            return
+        if not MENU_ASSETS_DIR:
+            MENU_ASSETS_DIR = (
+                DEFAULT_MENU_ASSETS_DIR
+                if os.path.isdir(DEFAULT_MENU_ASSETS_DIR)
+                else LEGACY_MENU_ASSETS_DIR
+            )
+        os.makedirs(VOICE_UPLOAD_DIR, exist_ok=True)
+        init_kitchens()
+        init_db()
+        APP_INITIALIZED = True
+
+
+def create_app():
+    init_app_state()
+    return app
+
+
+@app.before_request
+def ensure_app_state():
+    init_app_state()
+    g.request_started = time.perf_counter()
+
+
+def get_admission_class():
+    if request.method == "POST":
+        return "write"
+    if request.method == "GET" and "/api/" in request.path:
+        return "poll"
+    return None
+
+
+@app.before_request
+def admit_request():
+    admission_class = get_admission_class()
+    if not admission_class:
+        return None
+    # A poll storm on one kitchen must not shed another kitchen's requests.
+    kitchen_id = (request.view_args or {}).get("kitchen_id")
+    with IN_FLIGHT_LOCK:
+        in_flight = IN_FLIGHT.setdefault(kitchen_id, {"poll": 0, "write": 0})
+        if admission_class == "write":
+            admitted = in_flight["write"] < MAX_WRITES_IN_FLIGHT
         else:
-            ring_time = datetime.now(timezone.utc)
-        if ring_time.tzinfo is None:
-            ring_time = ring_time.replace(tzinfo=timezone.utc)
-        if ring_time >= cutoff:
-            kept.append(ring)
-    RING_EVENTS.clear()
-    RING_EVENTS.extend(kept)
+            admitted = in_flight["poll"] < max(1, MAX_POLLS_IN_FLIGHT - in_flight["write"])
+        if admitted:
+            in_flight[admission_class] += 1
+            g.admission_class = (kitchen_id, admission_class)
+            return None
+    g.admission_rejected = True
+    if admission_class == "write":
+        response = jsonify({"error": "Busy, please retry"})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(WRITE_RETRY_AFTER_SECONDS)
+    else:
+        response = jsonify({"error": "Too many requests"})
+        response.status_code = 429
+        response.headers["Retry-After"] = str(POLL_RETRY_AFTER_SECONDS)
+    return response
+
+
+@app.teardown_request
+def release_admission(error=None):
+    admission = g.pop("admission_class", None)
+    if admission:
+        kitchen_id, admission_class = admission
+        with IN_FLIGHT_LOCK:
+            IN_FLIGHT[kitchen_id][admission_class] -= 1
+
+
+@app.after_request
+def record_route_timing(response):
+    started = g.get("request_started")
+    if started is None or not request.endpoint:
+        return response
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    cache_status = g.get("cache_status")
+    # Only kitchen routes are recorded, each under its own kitchen.
+    kitchen = KITCHENS.get((request.view_args or {}).get("kitchen_id"))
+    if kitchen:
+        with kitchen["lock"]:
+            stats = kitchen["route_timings"].setdefault(
+                request.endpoint,
+                {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "cache_hits": 0, "rejected": 0},
+            )
+            stats["count"] += 1
+            stats["rejected"] += bool(g.get("admission_rejected"))
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            stats["cache_hits"] += cache_status == "hit"
+    timing = f"app;dur={elapsed_ms:.2f}"
+    if cache_status:
+        timing += f', cache;desc="{cache_status}"'
+    response.headers["Server-Timing"] = timing
+    return response
+
+
+@app.context_processor
+def inject_kitchen():
+    kitchen_id = (request.view_args or {}).get("kitchen_id", DEFAULT_KITCHEN_ID)
+    return {
+        "kitchen_id": kitchen_id,
+        "kitchen_prefix": kitchen_prefix(kitchen_id),
+    }
 
 
-def menu_items_with_availability():
+def menu_items_with_availability(kitchen: dict):
     items = []
-    for category, entries in MENU.items():
+    for category, entries in kitchen["menu"].items():
         for entry in entries:
             name = entry.get("name", "")
             key = normalize_item_name(name)
-            available = MENU_AVAILABILITY.get(key, True)
+            available = kitchen["menu_availability"].get(key, True)
             items.append(
                 {
                     "name": name,
@@ -241,72 +998,78 @@ def menu_items_with_availability():
     return items
 
 
-def prune_rings():
+def prune_rings(kitchen: dict):
+    ring_events = kitchen["ring_events"]
     cutoff = datetime.now(timezone.utc) - timedelta(hours=12)
-    kept = []
-    for ring in RING_EVENTS:
-        created_iso = ring.get("created_at_iso")
-        if created_iso:
-            try:
-                ring_time = datetime.fromisoformat(created_iso)
-            except ValueError:
+    with kitchen["lock"]:
+        kept = []
+        for ring in ring_events:
+            created_iso = ring.get("created_at_iso")
+            if created_iso:
+                try:
+                    ring_time = datetime.fromisoformat(created_iso)
+                except ValueError:
+                    ring_time = datetime.now(timezone.utc)
+            else:
                 ring_time = datetime.now(timezone.utc)
-        else:
-            ring_time = datetime.now(timezone.utc)
-        if ring_time.tzinfo is None:
-            ring_time = ring_time.replace(tzinfo=timezone.utc)
-        if ring_time >= cutoff:
-            kept.append(ring)
-    RING_EVENTS.clear()
-    RING_EVENTS.extend(kept)
+            if ring_time.tzinfo is None:
+                ring_time = ring_time.replace(tzinfo=timezone.utc)
+            if ring_time >= cutoff:
+                kept.append(ring)
+        ring_events[:] = kept
 
 
-def get_lunch_checkins_for_date(date_str: str):
+def get_lunch_checkins_for_date(kitchen_id: str, date_str: str):
     conn = get_db()
     try:
         rows = conn.execute(
-            "SELECT employee_name, checked_at_iso FROM lunch_checkins WHERE checked_date = ? ORDER BY checked_at_iso",
-            (date_str,),
+            """
+            SELECT employee_name, checked_at_iso FROM lunch_checkins
+            WHERE kitchen_id = ? AND checked_date = ?
+            ORDER BY checked_at_iso
+            """,
+            (kitchen_id, date_str),
         ).fetchall()
         return [dict(row) for row in rows]
     finally:
         conn.close()
 
 
-def set_lunch_checkin(employee_name: str, date_str: str, checked_at_iso: str):
+def set_lunch_checkin(kitchen_id: str, employee_name: str, date_str: str, checked_at_iso: str):
     conn = get_db()
     try:
         conn.execute(
             """
-            INSERT INTO lunch_checkins (employee_name, checked_at_iso, checked_date)
-            VALUES (?, ?, ?)
-            ON CONFLICT(employee_name, checked_date) DO UPDATE SET
+            INSERT INTO lunch_checkins (kitchen_id, employee_name, checked_at_iso, checked_date)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(kitchen_id, employee_name, checked_date) DO UPDATE SET
               checked_at_iso = excluded.checked_at_iso
             """,
-            (employee_name, checked_at_iso, date_str),
+            (kitchen_id, employee_name, checked_at_iso, date_str),
         )
         conn.commit()
     finally:
         conn.close()
 
 
-def delete_lunch_checkin(employee_name: str, date_str: str):
+def delete_lunch_checkin(kitchen_id: str, employee_name: str, date_str: str):
     conn = get_db()
     try:
         conn.execute(
-            "DELETE FROM lunch_checkins WHERE employee_name = ? AND checked_date = ?",
-            (employee_name, date_str),
+            "DELETE FROM lunch_checkins WHERE kitchen_id = ? AND employee_name = ? AND checked_date = ?",
+            (kitchen_id, employee_name, date_str),
         )
         conn.commit()
     finally:
         conn.close()
 
 
-def get_lunch_prediction(date_obj: datetime):
+def get_lunch_prediction(kitchen_id: str, date_obj: datetime):
     conn = get_db()
     try:
         first_row = conn.execute(
-            "SELECT MIN(checked_date) as first_date FROM lunch_checkins"
+            "SELECT MIN(checked_date) as first_date FROM lunch_checkins WHERE kitchen_id = ?",
+            (kitchen_id,),
         ).fetchone()
         first_date = first_row["first_date"] if first_row else None
         if not first_date:
@@ -323,10 +1086,10 @@ def get_lunch_prediction(date_obj: datetime):
             """
             SELECT checked_date, COUNT(*) as count
             FROM lunch_checkins
-            WHERE checked_date >= ? AND checked_date < ?
+            WHERE kitchen_id = ? AND checked_date >= ? AND checked_date < ?
             GROUP BY checked_date
             """,
-            (start, end),
+            (kitchen_id, start, end),
         ).fetchall()
     finally:
         conn.close()
@@ -345,16 +1108,217 @@ def get_lunch_prediction(date_obj: datetime):
         return None
     return int(round(sum(weekday_counts) / len(weekday_counts)))
 
-NEXT_ORDER_ID = 1
-NEXT_PRESET_ID = 1
+# Expired orders are moved into per-kitchen monthly partitions
+# (order_archive_<kitchen>_YYYYMM) and folded into the day-level rollup tables,
+# so analytics never scan raw rows.
+ARCHIVE_PARTITIONS = set()
+PREP_PERCENTILES = (50, 90, 95)
+
+
+def archive_partition_name(kitchen_id: str, created_at: datetime) -> str:
+    return f"order_archive_{kitchen_id}_{created_at.strftime('%Y%m')}"
+
+
+def ensure_archive_partition(conn, table: str, created: set):
+    if table in ARCHIVE_PARTITIONS or table in created:
+        return
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+          archive_id INTEGER PRIMARY KEY AUTOINCREMENT,
+          order_id INTEGER NOT NULL,
+          employee_name TEXT NOT NULL,
+          mate_name TEXT,
+          order_text TEXT,
+          order_items_json TEXT,
+          requirements TEXT,
+          status TEXT,
+          created_at_iso TEXT NOT NULL,
+          day TEXT NOT NULL,
+          hour INTEGER NOT NULL,
+          prep_minutes INTEGER,
+          UNIQUE(order_id, created_at_iso)
+        )
+        """
+    )
+    # Recorded in ARCHIVE_PARTITIONS only after the transaction commits; a
+    # rollback also drops the table.
+    created.add(table)
+
+
+def archive_orders(kitchen_id: str, orders: list):
+    conn = get_db()
+    created_partitions = set()
+    try:
+        for order in orders:
+            created_at = get_order_created_at(order).astimezone(IST_TZ)
+            day = created_at.date().isoformat()
+            hour = created_at.hour
+            employee_name = str(order.get("employee_name", "")).strip()
+            order_items = order.get("order_items") or []
+            prep_minutes = get_order_prep_minutes(order)
+            table = archive_partition_name(kitchen_id, created_at)
+            ensure_archive_partition(conn, table, created_partitions)
+            cursor = conn.execute(
+                f"""
+                INSERT OR IGNORE INTO {table} (
+                  order_id, employee_name, mate_name, order_text, order_items_json,
+                  requirements, status, created_at_iso, day, hour, prep_minutes
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    order.get("id"),
+                    employee_name,
+                    order.get("mate_name", ""),
+                    order.get("order_text", ""),
+                    json.dumps(order_items),
+                    order.get("requirements", ""),
+                    order.get("status", ""),
+                    created_at.isoformat(),
+                    day,
+                    hour,
+                    prep_minutes,
+                ),
+            )
+            if cursor.rowcount == 0:
+                # Already archived by an earlier prune; rollups are up to date.
+                continue
+            if order.get("status") == "Cancelled":
+                continue
+            for item in order_items:
+                name = str(item.get("name", "")).strip()
+                qty = int(item.get("qty", 0) or 0)
+                if not name or qty <= 0:
+                    continue
+                conn.execute(
+                    """
+                    INSERT INTO order_item_hourly (kitchen_id, day, hour, item_name, qty)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(kitchen_id, day, hour, item_name) DO UPDATE SET
+                      qty = qty + excluded.qty
+                    """,
+                    (kitchen_id, day, hour, name, qty),
+                )
+            if prep_minutes is not None:
+                conn.execute(
+                    """
+                    INSERT INTO order_prep_daily (kitchen_id, day, minutes, count)
+                    VALUES (?, ?, ?, 1)
+                    ON CONFLICT(kitchen_id, day, minutes) DO UPDATE SET
+                      count = count + 1
+                    """,
+                    (kitchen_id, day, prep_minutes),
+                )
+            if employee_name:
+                conn.execute(
+                    """
+                    INSERT INTO order_employee_daily (kitchen_id, day, employee_name, orders)
+                    VALUES (?, ?, ?, 1)
+                    ON CONFLICT(kitchen_id, day, employee_name) DO UPDATE SET
+                      orders = orders + 1
+                    """,
+                    (kitchen_id, day, employee_name),
+                )
+        conn.commit()
+        ARCHIVE_PARTITIONS.update(created_partitions)
+    finally:
+        conn.close()
+
+
+def get_analytics_range(days: int):
+    end = now_ist().date()
+    start = end - timedelta(days=days - 1)
+    return start.isoformat(), end.isoformat()
+
+
+def get_items_per_hour(kitchen_id: str, days: int):
+    start, end = get_analytics_range(days)
+    conn = get_db()
+    try:
+        rows = conn.execute(
+            """
+            SELECT hour, item_name, SUM(qty) as qty
+            FROM order_item_hourly
+            WHERE kitchen_id = ? AND day >= ? AND day <= ?
+            GROUP BY hour, item_name
+            ORDER BY hour, qty DESC
+            """,
+            (kitchen_id, start, end),
+        ).fetchall()
+    finally:
+        conn.close()
+    hours = {}
+    for row in rows:
+        bucket = hours.setdefault(row["hour"], {"hour": row["hour"], "total": 0, "items": []})
+        bucket["total"] += row["qty"]
+        bucket["items"].append({"name": row["item_name"], "qty": row["qty"]})
+    return [hours[hour] for hour in sorted(hours)]
+
+
+def get_prep_time_percentiles(kitchen_id: str, days: int):
+    start, end = get_analytics_range(days)
+    conn = get_db()
+    try:
+        rows = conn.execute(
+            """
+            SELECT minutes, SUM(count) as count
+            FROM order_prep_daily
+            WHERE kitchen_id = ? AND day >= ? AND day <= ?
+            GROUP BY minutes
+            ORDER BY minutes
+            """,
+            (kitchen_id, start, end),
+        ).fetchall()
+    finally:
+        conn.close()
+    total = sum(row["count"] for row in rows)
+    percentiles = {f"p{pct}": None for pct in PREP_PERCENTILES}
+    if not total:
+        return {"count": 0, **percentiles}
+    targets = [(pct, pct / 100 * total) for pct in PREP_PERCENTILES]
+    seen = 0
+    for row in rows:
+        seen += row["count"]
+        while targets and seen >= targets[0][1]:
+            percentiles[f"p{targets.pop(0)[0]}"] = row["minutes"]
+    return {"count": total, **percentiles}
+
+
+def get_employee_order_frequency(kitchen_id: str, days: int, limit: int):
+    start, end = get_analytics_range(days)
+    conn = get_db()
+    try:
+        rows = conn.execute(
+            """
+            SELECT employee_name, SUM(orders) as orders
+            FROM order_employee_daily
+            WHERE kitchen_id = ? AND day >= ? AND day <= ?
+            GROUP BY employee_name
+            ORDER BY orders DESC, employee_name
+            LIMIT ?
+            """,
+            (kitchen_id, start, end, limit),
+        ).fetchall()
+    finally:
+        conn.close()
+    return [dict(row) for row in rows]
+
+
+def get_analytics_days():
+    try:
+        days = int(request.args.get("days", "7"))
+    except ValueError:
+        days = 7
+    return min(max(days, 1), 366)
 
 
 def is_employee_token(token: str) -> bool:
     return token == EMPLOYEE_TOKEN
 
 
-def is_chef_token(token: str) -> bool:
-    return token == CHEF_TOKEN
+def is_chef_token(kitchen: dict, token: str) -> bool:
+    return token == kitchen["chef_token"]
 
 
 @app.get("/menu-images/<path:filename>")
@@ -362,41 +1326,59 @@ def menu_images(filename: str):
     return send_from_directory(MENU_ASSETS_DIR, filename)
 
 
-@app.get("/")
-def index():
-    return redirect(url_for("employee_order", token=EMPLOYEE_TOKEN))
+@app.get("/sw.js")
+def service_worker():
+    # Served from the root so the worker's scope covers every page and API call.
+    response = send_from_directory(app.static_folder, "sw.js", max_age=0)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@app.get("/offline.html")
+def offline_page():
+    return send_from_directory(app.static_folder, "offline.html")
 
-@app.get("/employee/<token>")
-def employee_order(token: str):
-    if not is_employee_token(token):
+
+@kitchen_get("/")
+def index(kitchen_id: str):
+    if not get_kitchen(kitchen_id):
+        return "Not found", 404
+    return redirect(url_for("employee_order", kitchen_id=kitchen_id, token=EMPLOYEE_TOKEN))
+
+@kitchen_get("/employee/<token>")
+def employee_order(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_employee_token(token):
         return "Not found", 404
-    prune_orders()
+    prune_orders(kitchen)
     employee_name = session.get("employee_name", "").strip()
     if not employee_name:
-        return redirect(url_for("employee_login", token=token))
+        return redirect(url_for("employee_login", kitchen_id=kitchen_id, token=token))
     return render_template(
         "index.html",
         employee_token=token,
         employee_name=employee_name,
-        menu=MENU,
+        menu=kitchen["menu"],
         sleeping=is_sleeping_now(),
     )
 
 
-@app.get("/employee/<token>/login")
-def employee_login(token: str):
-    if not is_employee_token(token):
+@kitchen_get("/employee/<token>/login")
+def employee_login(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_employee_token(token):
         return "Not found", 404
     return render_template("employee_login.html", employee_token=token)
 
 
-@app.post("/employee/<token>/login")
-def employee_login_submit(token: str):
-    if not is_employee_token(token):
+@kitchen_post("/employee/<token>/login")
+def employee_login_submit(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_employee_token(token):
         return "Not found", 404
     role = request.form.get("role", "employee").strip().lower()
     if role == "chef":
-        return redirect(url_for("chef_dashboard", token=CHEF_TOKEN))
+        return redirect(url_for("chef_dashboard", kitchen_id=kitchen_id, token=kitchen["chef_token"]))
     employee_name = request.form.get("employee_name", "").strip()
     if not employee_name:
         return render_template(
@@ -405,31 +1387,59 @@ def employee_login_submit(token: str):
             error="Please enter your name.",
         )
     session["employee_name"] = employee_name
-    return redirect(url_for("employee_order", token=token))
+    return redirect(url_for("employee_order", kitchen_id=kitchen_id, token=token))
 
 
-@app.get("/employee/<token>/logout")
-def employee_logout(token: str):
-    if not is_employee_token(token):
+@kitchen_get("/employee/<token>/logout")
+def employee_logout(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_employee_token(token):
         return "Not found", 404
     session.pop("employee_name", None)
-    return redirect(url_for("employee_login", token=token))
+    return redirect(url_for("employee_login", kitchen_id=kitchen_id, token=token))
+
+
+def render_order_error(kitchen: dict, token: str, error: str, **context):
+    # Scripted submissions and offline replays send an Idempotency-Key header
+    # and need a failing status; a plain form post gets the page back.
+    if request.headers.get("Idempotency-Key"):
+        return jsonify({"error": error}), 422
+    return render_template(
+        "index.html",
+        error=error,
+        employee_token=token,
+        menu=kitchen["menu"],
+        **context,
+    )
 
 
-@app.post("/employee/<token>/order")
-def place_order(token: str):
-    global NEXT_ORDER_ID
-    if not is_employee_token(token):
+@kitchen_post("/employee/<token>/order")
+def place_order(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_employee_token(token):
         return "Not found", 404
-    prune_orders()
-    if is_sleeping_now():
+    prune_orders(kitchen)
+    idempotency_key = get_idempotency_key()
+    existing_id = get_idempotent_result(kitchen, "order", idempotency_key)
+    existing = find_order(kitchen, existing_id) if existing_id is not None else None
+    if existing:
+        return redirect(
+            url_for(
+                "order_status",
+                kitchen_id=kitchen_id,
+                token=token,
+                order_id=existing["id"],
+                name=existing.get("employee_name", ""),
+            )
+        )
+    pickup_slot = request.form.get("pickup_slot", "").strip()
+    if is_sleeping_now() and not pickup_slot:
         employee_name = session.get("employee_name", "").strip()
-        return render_template(
-            "index.html",
-            error="Ordering is closed for today.",
+        return render_order_error(
+            kitchen,
+            token,
+            "Ordering is closed for today. Choose a pickup slot to pre-order.",
             employee_name=employee_name,
-            employee_token=token,
-            menu=MENU,
             sleeping=True,
         )
     employee_name = session.get("employee_name", "").strip()
@@ -454,36 +1464,78 @@ def place_order(token: str):
             order_items = []
 
     if not employee_name:
-        return redirect(url_for("employee_login", token=token))
-
-    if voice_file and voice_file.filename:
-        original = secure_filename(voice_file.filename)
-        ext = os.path.splitext(original)[1] or ".webm"
-        voice_filename = f"{uuid4().hex}{ext}"
-        voice_path = os.path.join(VOICE_UPLOAD_DIR, voice_filename)
-        voice_file.save(voice_path)
-
-    if not order_items and not order_text and not voice_filename:
-        return render_template(
-            "index.html",
-            error="Please add at least one item.",
+        return redirect(url_for("employee_login", kitchen_id=kitchen_id, token=token))
+
+    has_voice = bool(voice_file and voice_file.filename)
+    if not order_items and not order_text and not has_voice:
+        return render_order_error(
+            kitchen,
+            token,
+            "Please add at least one item.",
             employee_name=employee_name,
             order_text=order_text,
             requirements=requirements,
             mate_name=mate_name,
-            employee_token=token,
-            menu=MENU,
+            sleeping=is_sleeping_now(),
         )
 
+    typed_text = order_text
     if not order_text and order_items:
         order_text = ", ".join(
             f"{item['name']} x{item['qty']}" for item in order_items
         )
+    order_items = resolve_order_items(kitchen, order_items, typed_text)
+    unavailable = find_unavailable_items(kitchen, order_items)
+    if unavailable:
+        return render_order_error(
+            kitchen,
+            token,
+            f"Currently unavailable: {', '.join(unavailable)}. Please remove and try again.",
+            employee_name=employee_name,
+            order_text=order_text,
+            requirements=requirements,
+            mate_name=mate_name,
+            sleeping=is_sleeping_now(),
+        )
+
+    pickup_at = None
+    if pickup_slot:
+        pickup_at = parse_pickup_slot(pickup_slot)
+        slot_error = ""
+        if not pickup_at:
+            slot_error = "That pickup slot is no longer available."
+        elif not reserve_pickup_slot(kitchen, pickup_at.isoformat()):
+            slot_error = "That pickup slot is full. Please choose another."
+        if slot_error:
+            return render_order_error(
+                kitchen,
+                token,
+                slot_error,
+                employee_name=employee_name,
+                order_text=order_text,
+                requirements=requirements,
+                mate_name=mate_name,
+                sleeping=is_sleeping_now(),
+            )
+
+    if has_voice:
+        original = secure_filename(voice_file.filename)
+        ext = os.path.splitext(original)[1] or ".webm"
+        voice_filename = f"{uuid4().hex}{ext}"
+        voice_path = os.path.join(VOICE_UPLOAD_DIR, voice_filename)
+        try:
+            voice_file.save(voice_path)
+        except BaseException:
+            # The order is never created, so give its pickup slot back.
+            if pickup_at:
+                release_pickup_slot(kitchen, pickup_at.isoformat())
+            raise
+
     if not order_text and voice_filename:
         order_text = "Voice order"
 
     order = {
-        "id": NEXT_ORDER_ID,
+        "kitchen_id": kitchen_id,
         "employee_name": employee_name,
         "mate_name": mate_name,
         "order_text": order_text,
@@ -496,73 +1548,152 @@ def place_order(token: str):
         "prep_minutes": None,
         "prep_started_at": None,
         "cancelled_at": None,
+        "pickup_at": None,
     }
-    ORDERS.append(order)
-    NEXT_ORDER_ID += 1
+    if pickup_at:
+        lead_minutes = estimate_prep_minutes(kitchen, order_items) + SCHEDULE_BUFFER_MINUTES
+        release_at = pickup_at - timedelta(minutes=lead_minutes)
+        order["status"] = "Scheduled"
+        order["pickup_at"] = pickup_at.isoformat()
+        order["release_at_iso"] = release_at.astimezone(timezone.utc).isoformat()
+    with kitchen["lock"]:
+        # A concurrent retry with the same key may have finished first.
+        existing_id = get_idempotent_result(kitchen, "order", idempotency_key)
+        if existing_id is None:
+            order["id"] = kitchen["next_order_id"]
+            kitchen["next_order_id"] += 1
+            if pickup_at:
+                schedule_order(kitchen, order)
+            else:
+                kitchen["orders"].append(order)
+            touch_order(kitchen, order)
+            remember_idempotent_result(kitchen, "order", idempotency_key, order["id"])
+    if existing_id is not None:
+        if pickup_at:
+            release_pickup_slot(kitchen, pickup_at.isoformat())
+        if voice_filename:
+            try:
+                os.remove(os.path.join(VOICE_UPLOAD_DIR, voice_filename))
+            except OSError:
+                pass
+        return redirect(
+            url_for(
+                "order_status",
+                kitchen_id=kitchen_id,
+                token=token,
+                order_id=existing_id,
+                name=employee_name,
+            )
+        )
+    record_favorite(kitchen, employee_name, order_items)
 
     return redirect(
-        url_for("order_status", token=token, order_id=order["id"], name=employee_name)
+        url_for("order_status", kitchen_id=kitchen_id, token=token, order_id=order["id"], name=employee_name)
     )
 
 
-@app.get("/order/success")
-def order_success():
-    prune_orders()
+@kitchen_get("/order/success")
+def order_success(kitchen_id: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen:
+        return "Not found", 404
+    prune_orders(kitchen)
     name = request.args.get("name", "").strip() or session.get("employee_name", "")
     return render_template("order_success.html", employee_name=name)
 
 
-@app.get("/employee/<token>/order/status/<int:order_id>")
-def order_status(token: str, order_id: int):
-    if not is_employee_token(token):
+@kitchen_get("/employee/<token>/order/status/<int:order_id>")
+def order_status(kitchen_id: str, token: str, order_id: int):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_employee_token(token):
         return "Not found", 404
-    prune_orders()
+    prune_orders(kitchen)
     name = request.args.get("name", "").strip() or session.get("employee_name", "")
-    order = next((item for item in ORDERS if item["id"] == order_id), None)
+    order = find_order(kitchen, order_id)
     if not order:
         return render_template("order_success.html", employee_name=name)
-    if not name:
-        name = order.get("employee_name", "")
-    previous_orders = [
-        item
-        for item in ORDERS
-        if item.get("employee_name") == name and item.get("id") != order_id
-    ]
-    previous_orders.sort(key=lambda item: item.get("id", 0), reverse=True)
-    return render_template(
-        "order_status.html",
-        employee_name=name,
-        order=order,
-        employee_token=token,
-        previous_orders=previous_orders,
-    )
+    # The page shows the owner's orders whatever ?name= says, so it is cached
+    # per order rather than per query string.
+    name = order.get("employee_name", "")
+
+    def render_page():
+        previous_orders = [
+            item
+            for item in get_employee_visible_orders(kitchen)
+            if item.get("employee_name") == name and item.get("id") != order_id
+        ]
+        previous_orders.sort(key=lambda item: item.get("id", 0), reverse=True)
+        previous_cards = [
+            get_cached_fragment(
+                kitchen,
+                ("previous_order_card", item["id"], item.get("version", 0)),
+                lambda item=item: render_template("previous_order_card.html", prev=item),
+            )[0]
+            for item in previous_orders
+        ]
+        return render_template(
+            "order_status.html",
+            employee_name=name,
+            order=order,
+            employee_token=token,
+            previous_cards=previous_cards,
+        )
 
+    page_key = (order.get("version", 0), kitchen["employee_versions"].get(name, 0))
+    html, hit = get_cached_page(kitchen, ("order_status", token, order_id), page_key, render_page)
+    g.cache_status = "hit" if hit else "miss"
+    return html
 
-@app.get("/chef/<token>")
-def chef_dashboard(token: str):
-    if not is_chef_token(token):
+
+@kitchen_get("/chef/<token>")
+def chef_dashboard(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_chef_token(kitchen, token):
         return "Not found", 404
-    prune_orders()
-    suggested_eta = get_smart_eta_minutes()
-    recent_orders = filter_recent_orders(ORDERS, 1)
-    orders_sorted = sorted(recent_orders, key=lambda item: item.get("id", 0), reverse=True)
-    return render_template(
-        "chef.html",
-        orders=orders_sorted,
-        chef_token=token,
-        employee_token=EMPLOYEE_TOKEN,
-        suggested_eta=suggested_eta,
+    prune_orders(kitchen)
+    suggested_eta = get_smart_eta_minutes(kitchen)
+    recent_orders = filter_recent_orders(kitchen["orders"], 1)
+    orders_sorted = sorted(recent_orders, key=order_queue_key, reverse=True)
+
+    def render_page():
+        order_cards = [
+            get_cached_fragment(
+                kitchen,
+                ("chef_order_card", order["id"], order.get("version", 0), suggested_eta),
+                lambda order=order: render_template(
+                    "chef_order_card.html", order=order, suggested_eta=suggested_eta
+                ),
+            )[0]
+            for order in orders_sorted
+        ]
+        return render_template(
+            "chef.html",
+            order_cards=order_cards,
+            chef_token=token,
+            employee_token=EMPLOYEE_TOKEN,
+            suggested_eta=suggested_eta,
+        )
+
+    # The visible id list changes as orders age out of the one-hour window.
+    page_key = (
+        kitchen["orders_version"],
+        tuple(order["id"] for order in orders_sorted),
+        suggested_eta,
     )
+    html, hit = get_cached_page(kitchen, ("chef", token), page_key, render_page)
+    g.cache_status = "hit" if hit else "miss"
+    return html
 
 
-@app.get("/api/chef/<token>/orders")
-def orders_api(token: str):
-    if not is_chef_token(token):
+@kitchen_get("/api/chef/<token>/orders")
+def orders_api(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_chef_token(kitchen, token):
         return jsonify({"error": "Not found"}), 404
-    prune_orders()
-    suggested_eta = get_smart_eta_minutes()
-    recent_orders = filter_recent_orders(ORDERS, 1)
-    orders_sorted = sorted(recent_orders, key=lambda item: item.get("id", 0), reverse=True)
+    prune_orders(kitchen)
+    suggested_eta = get_smart_eta_minutes(kitchen)
+    recent_orders = filter_recent_orders(kitchen["orders"], 1)
+    orders_sorted = sorted(recent_orders, key=order_queue_key, reverse=True)
     orders = []
     for order in orders_sorted:
         item = dict(order)
@@ -571,32 +1702,43 @@ def orders_api(token: str):
     return jsonify(orders)
 
 
-@app.get("/api/employee/<token>/menu")
-def employee_menu_api(token: str):
-    if not is_employee_token(token):
+@kitchen_get("/api/employee/<token>/menu")
+def employee_menu_api(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_employee_token(token):
         return jsonify({"error": "Not found"}), 404
-    items = [item for item in menu_items_with_availability() if item["available"]]
+    items = [item for item in menu_items_with_availability(kitchen) if item["available"]]
     return jsonify(items)
 
 
-@app.get("/api/employee/<token>/lunch-checkin")
-def employee_lunch_checkin_status(token: str):
-    if not is_employee_token(token):
+@kitchen_get("/api/employee/<token>/pickup-slots")
+def employee_pickup_slots(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_employee_token(token):
+        return jsonify({"error": "Not found"}), 404
+    return jsonify(get_pickup_slots(kitchen))
+
+
+@kitchen_get("/api/employee/<token>/lunch-checkin")
+def employee_lunch_checkin_status(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_employee_token(token):
         return jsonify({"error": "Not found"}), 404
     employee_name = session.get("employee_name", "").strip()
     if not employee_name:
         return jsonify({"checked": False})
     today = now_ist().date().isoformat()
-    rows = get_lunch_checkins_for_date(today)
+    rows = get_lunch_checkins_for_date(kitchen_id, today)
     checked = any(
         row["employee_name"].strip().lower() == employee_name.lower() for row in rows
     )
     return jsonify({"checked": checked})
 
 
-@app.post("/api/employee/<token>/lunch-checkin")
-def employee_lunch_checkin(token: str):
-    if not is_employee_token(token):
+@kitchen_post("/api/employee/<token>/lunch-checkin")
+def employee_lunch_checkin(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_employee_token(token):
         return jsonify({"error": "Not found"}), 404
     employee_name = session.get("employee_name", "").strip()
     if not employee_name:
@@ -605,22 +1747,24 @@ def employee_lunch_checkin(token: str):
     took = bool(payload.get("took"))
     today = now_ist().date().isoformat()
     if took:
-        set_lunch_checkin(employee_name, today, now_iso())
+        set_lunch_checkin(kitchen_id, employee_name, today, now_iso())
     else:
-        delete_lunch_checkin(employee_name, today)
+        delete_lunch_checkin(kitchen_id, employee_name, today)
     return jsonify({"checked": took})
 
 
-@app.get("/api/chef/<token>/menu")
-def chef_menu_api(token: str):
-    if not is_chef_token(token):
+@kitchen_get("/api/chef/<token>/menu")
+def chef_menu_api(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_chef_token(kitchen, token):
         return jsonify({"error": "Not found"}), 404
-    return jsonify(menu_items_with_availability())
+    return jsonify(menu_items_with_availability(kitchen))
 
 
-@app.post("/api/chef/<token>/menu/availability")
-def chef_menu_availability_update(token: str):
-    if not is_chef_token(token):
+@kitchen_post("/api/chef/<token>/menu/availability")
+def chef_menu_availability_update(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_chef_token(kitchen, token):
         return jsonify({"error": "Not found"}), 404
     payload = request.get_json(silent=True) or {}
     name = str(payload.get("name", "")).strip()
@@ -630,26 +1774,28 @@ def chef_menu_availability_update(token: str):
     key = normalize_item_name(name)
     if not key:
         return jsonify({"error": "Invalid item"}), 400
-    MENU_AVAILABILITY[key] = bool(available)
-    return jsonify({"name": name, "available": MENU_AVAILABILITY[key]})
+    kitchen["menu_availability"][key] = bool(available)
+    return jsonify({"name": name, "available": kitchen["menu_availability"][key]})
 
 
-@app.get("/api/chef/<token>/lunch-checkins")
-def chef_lunch_checkins(token: str):
-    if not is_chef_token(token):
+@kitchen_get("/api/chef/<token>/lunch-checkins")
+def chef_lunch_checkins(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_chef_token(kitchen, token):
         return jsonify({"error": "Not found"}), 404
     today = now_ist().date().isoformat()
-    rows = get_lunch_checkins_for_date(today)
+    rows = get_lunch_checkins_for_date(kitchen_id, today)
     names = [row["employee_name"] for row in rows]
     return jsonify({"date": today, "count": len(names), "names": names})
 
 
-@app.get("/api/chef/<token>/lunch-prediction")
-def chef_lunch_prediction(token: str):
-    if not is_chef_token(token):
+@kitchen_get("/api/chef/<token>/lunch-prediction")
+def chef_lunch_prediction(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_chef_token(kitchen, token):
         return jsonify({"error": "Not found"}), 404
     now = now_ist()
-    predicted = get_lunch_prediction(now)
+    predicted = get_lunch_prediction(kitchen_id, now)
     return jsonify(
         {
             "predicted": predicted,
@@ -659,41 +1805,96 @@ def chef_lunch_prediction(token: str):
     )
 
 
-@app.get("/api/chef/<token>/rings")
-def chef_ring_events(token: str):
-    if not is_chef_token(token):
+@kitchen_get("/api/chef/<token>/analytics/items-per-hour")
+def chef_analytics_items_per_hour(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_chef_token(kitchen, token):
+        return jsonify({"error": "Not found"}), 404
+    days = get_analytics_days()
+    return jsonify({"days": days, "hours": get_items_per_hour(kitchen_id, days)})
+
+
+@kitchen_get("/api/chef/<token>/analytics/prep-times")
+def chef_analytics_prep_times(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_chef_token(kitchen, token):
+        return jsonify({"error": "Not found"}), 404
+    days = get_analytics_days()
+    return jsonify({"days": days, **get_prep_time_percentiles(kitchen_id, days)})
+
+
+@kitchen_get("/api/chef/<token>/analytics/employees")
+def chef_analytics_employees(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_chef_token(kitchen, token):
+        return jsonify({"error": "Not found"}), 404
+    days = get_analytics_days()
+    try:
+        limit = int(request.args.get("limit", "20"))
+    except ValueError:
+        limit = 20
+    limit = min(max(limit, 1), 200)
+    return jsonify({"days": days, "employees": get_employee_order_frequency(kitchen_id, days, limit)})
+
+
+@kitchen_get("/api/chef/<token>/timings")
+def chef_route_timings(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_chef_token(kitchen, token):
         return jsonify({"error": "Not found"}), 404
-    prune_rings()
-    return jsonify(RING_EVENTS[-20:])
+    with kitchen["lock"]:
+        snapshot = {endpoint: dict(stats) for endpoint, stats in kitchen["route_timings"].items()}
+    timings = {}
+    for endpoint, stats in snapshot.items():
+        timings[endpoint] = {
+            "count": stats["count"],
+            "avg_ms": round(stats["total_ms"] / stats["count"], 3),
+            "max_ms": round(stats["max_ms"], 3),
+            "cache_hits": stats["cache_hits"],
+            "rejected": stats["rejected"],
+        }
+    return jsonify(timings)
 
 
-@app.get("/api/employee/<token>/orders/<int:order_id>")
-def order_detail_api(token: str, order_id: int):
-    if not is_employee_token(token):
+@kitchen_get("/api/chef/<token>/rings")
+def chef_ring_events(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_chef_token(kitchen, token):
         return jsonify({"error": "Not found"}), 404
-    prune_orders()
-    order = next((item for item in ORDERS if item["id"] == order_id), None)
+    prune_rings(kitchen)
+    return jsonify(kitchen["ring_events"][-20:])
+
+
+@kitchen_get("/api/employee/<token>/orders/<int:order_id>")
+def order_detail_api(kitchen_id: str, token: str, order_id: int):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_employee_token(token):
+        return jsonify({"error": "Not found"}), 404
+    prune_orders(kitchen)
+    order = find_order(kitchen, order_id)
     if not order:
         return jsonify({"error": "Order not found"}), 404
     return jsonify(order)
 
 
-@app.get("/api/employee/<token>/lunch-ready")
-def lunch_ready_status(token: str):
-    if not is_employee_token(token):
+@kitchen_get("/api/employee/<token>/lunch-ready")
+def lunch_ready_status(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_employee_token(token):
         return jsonify({"error": "Not found"}), 404
-    return jsonify(LUNCH_READY)
+    return jsonify(kitchen["lunch_ready"])
 
 
-@app.get("/api/employee/<token>/mate-orders")
-def employee_mate_orders(token: str):
-    if not is_employee_token(token):
+@kitchen_get("/api/employee/<token>/mate-orders")
+def employee_mate_orders(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_employee_token(token):
         return jsonify({"error": "Not found"}), 404
     employee_name = session.get("employee_name", "").strip()
     if not employee_name:
         return jsonify([])
     matches = []
-    for order in ORDERS:
+    for order in get_employee_visible_orders(kitchen):
         mate_name = str(order.get("mate_name", "")).strip()
         if mate_name and mate_name.lower() == employee_name.lower():
             matches.append(
@@ -707,15 +1908,16 @@ def employee_mate_orders(token: str):
     return jsonify(matches)
 
 
-@app.get("/api/employee/<token>/my-orders")
-def employee_my_orders(token: str):
-    if not is_employee_token(token):
+@kitchen_get("/api/employee/<token>/my-orders")
+def employee_my_orders(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_employee_token(token):
         return jsonify({"error": "Not found"}), 404
     employee_name = session.get("employee_name", "").strip()
     if not employee_name:
         return jsonify([])
     matches = []
-    for order in ORDERS:
+    for order in get_employee_visible_orders(kitchen):
         owner = str(order.get("employee_name", "")).strip()
         if owner.lower() == employee_name.lower():
             matches.append(
@@ -723,61 +1925,103 @@ def employee_my_orders(token: str):
                     "id": order.get("id"),
                     "order_text": order.get("order_text", ""),
                     "status": order.get("status", ""),
+                    "pickup_at": order.get("pickup_at"),
                 }
             )
     matches.sort(key=lambda item: item.get("id", 0), reverse=True)
     return jsonify(matches)
 
 
-@app.post("/api/employee/<token>/orders/<int:order_id>/cancel")
-def employee_cancel_order(token: str, order_id: int):
-    if not is_employee_token(token):
+@kitchen_get("/api/employee/<token>/favorites")
+def employee_favorites(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_employee_token(token):
+        return jsonify({"error": "Not found"}), 404
+    employee_key = session.get("employee_name", "").strip().lower()
+    if not employee_key:
+        return jsonify([])
+    favorites = load_employee_favorites(kitchen, employee_key)
+    return jsonify(
+        [
+            {
+                "order_items": favorite["order_items"],
+                "label": ", ".join(f"{item['name']} x{item['qty']}" for item in favorite["order_items"]),
+                "count": favorite["count"],
+            }
+            for favorite in list(favorites["top"])
+        ]
+    )
+
+
+@kitchen_post("/api/employee/<token>/orders/<int:order_id>/cancel")
+def employee_cancel_order(kitchen_id: str, token: str, order_id: int):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_employee_token(token):
         return jsonify({"error": "Not found"}), 404
     employee_name = session.get("employee_name", "").strip().lower()
     if not employee_name:
         return jsonify({"error": "Name required"}), 400
-    order = next((item for item in ORDERS if item["id"] == order_id), None)
+    order = find_order(kitchen, order_id)
     if not order:
         return jsonify({"error": "Order not found"}), 404
     owner = str(order.get("employee_name", "")).strip().lower()
     mate = str(order.get("mate_name", "")).strip().lower()
     if employee_name not in {owner, mate}:
         return jsonify({"error": "Not allowed"}), 403
-    status = order.get("status", "")
-    if status in {"Ready", "Delivered", "Cancelled"}:
-        return jsonify({"error": "Cannot cancel now"}), 400
-    order["status"] = "Cancelled"
-    order["cancelled_at"] = now_iso()
+    idempotency_key = get_idempotency_key()
+    with kitchen["lock"]:
+        if get_idempotent_result(kitchen, "cancel", idempotency_key) == order_id:
+            return jsonify(order)
+        status = order.get("status", "")
+        if status in {"Ready", "Delivered", "Cancelled"}:
+            return jsonify({"error": "Cannot cancel now"}), 400
+        order["status"] = "Cancelled"
+        order["cancelled_at"] = now_iso()
+        touch_order(kitchen, order)
+        remember_idempotent_result(kitchen, "cancel", idempotency_key, order_id)
+    if status == "Scheduled":
+        # The chef never saw this order; just free its pickup slot.
+        release_pickup_slot(kitchen, order["pickup_at"])
+        return jsonify(order)
     ring = {
         "id": uuid4().hex,
         "employee_name": employee_name or order.get("employee_name", ""),
         "created_at_iso": now_iso(),
         "message": "Order cancelled",
     }
-    RING_EVENTS.append(ring)
+    with kitchen["lock"]:
+        kitchen["ring_events"].append(ring)
     return jsonify(order)
 
 
-@app.post("/api/employee/<token>/ring")
-def employee_ring(token: str):
-    if not is_employee_token(token):
+@kitchen_post("/api/employee/<token>/ring")
+def employee_ring(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_employee_token(token):
         return jsonify({"error": "Not found"}), 404
     employee_name = session.get("employee_name", "").strip()
     if not employee_name:
         return jsonify({"error": "Name required"}), 400
-    prune_rings()
-    ring = {
-        "id": uuid4().hex,
-        "employee_name": employee_name,
-        "created_at_iso": now_iso(),
-    }
-    RING_EVENTS.append(ring)
+    idempotency_key = get_idempotency_key()
+    prune_rings(kitchen)
+    with kitchen["lock"]:
+        existing = get_idempotent_result(kitchen, "ring", idempotency_key)
+        if existing:
+            return jsonify(existing), 201
+        ring = {
+            "id": uuid4().hex,
+            "employee_name": employee_name,
+            "created_at_iso": now_iso(),
+        }
+        kitchen["ring_events"].append(ring)
+        remember_idempotent_result(kitchen, "ring", idempotency_key, ring)
     return jsonify(ring), 201
 
 
-@app.post("/api/chef/<token>/orders/<int:order_id>/status")
-def update_order_status(token: str, order_id: int):
-    if not is_chef_token(token):
+@kitchen_post("/api/chef/<token>/orders/<int:order_id>/status")
+def update_order_status(kitchen_id: str, token: str, order_id: int):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_chef_token(kitchen, token):
         return jsonify({"error": "Not found"}), 404
     payload = request.get_json(silent=True) or {}
     status = str(payload.get("status", "")).strip()
@@ -785,51 +2029,58 @@ def update_order_status(token: str, order_id: int):
     if status not in allowed:
         return jsonify({"error": "Invalid status"}), 400
 
-    order = next((item for item in ORDERS if item["id"] == order_id), None)
+    order = next((item for item in kitchen["orders"] if item["id"] == order_id), None)
     if not order:
         return jsonify({"error": "Order not found"}), 404
-    if order.get("status") == "Cancelled":
-        return jsonify({"error": "Order cancelled"}), 400
-
-    order["status"] = status
-    if status == "Ready":
-        order["ready_at"] = now_iso()
-    if status == "Delivered":
-        order["delivered_at"] = now_iso()
-        voice_filename = order.get("voice_filename", "")
-        if voice_filename:
-            voice_path = os.path.join(VOICE_UPLOAD_DIR, voice_filename)
-            try:
-                if os.path.isfile(voice_path):
-                    os.remove(voice_path)
-            except OSError:
-                pass
+
+    voice_filename = ""
+    # Checked and written under the lock so a concurrent cancel is not undone.
+    with kitchen["lock"]:
+        if order.get("status") == "Cancelled":
+            return jsonify({"error": "Order cancelled"}), 400
+        order["status"] = status
+        if status == "Ready":
+            order["ready_at"] = now_iso()
+        if status == "Delivered":
+            order["delivered_at"] = now_iso()
+            voice_filename = order.get("voice_filename", "")
             order["voice_filename"] = ""
+        touch_order(kitchen, order)
+    if voice_filename:
+        voice_path = os.path.join(VOICE_UPLOAD_DIR, voice_filename)
+        try:
+            if os.path.isfile(voice_path):
+                os.remove(voice_path)
+        except OSError:
+            pass
     return jsonify(order)
 
 
-@app.get("/api/chef/<token>/lunch-ready")
-def chef_lunch_ready_status(token: str):
-    if not is_chef_token(token):
+@kitchen_get("/api/chef/<token>/lunch-ready")
+def chef_lunch_ready_status(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_chef_token(kitchen, token):
         return jsonify({"error": "Not found"}), 404
-    return jsonify(LUNCH_READY)
+    return jsonify(kitchen["lunch_ready"])
 
 
-@app.post("/api/chef/<token>/lunch-ready")
-def chef_lunch_ready_update(token: str):
-    if not is_chef_token(token):
+@kitchen_post("/api/chef/<token>/lunch-ready")
+def chef_lunch_ready_update(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_chef_token(kitchen, token):
         return jsonify({"error": "Not found"}), 404
     payload = request.get_json(silent=True) or {}
     ready_value = payload.get("ready")
     ready = bool(ready_value)
-    LUNCH_READY["is_ready"] = ready
-    LUNCH_READY["updated_at"] = now_iso()
-    return jsonify(LUNCH_READY)
+    kitchen["lunch_ready"]["is_ready"] = ready
+    kitchen["lunch_ready"]["updated_at"] = now_iso()
+    return jsonify(kitchen["lunch_ready"])
 
 
-@app.post("/api/chef/<token>/orders/<int:order_id>/prep")
-def update_prep_time(token: str, order_id: int):
-    if not is_chef_token(token):
+@kitchen_post("/api/chef/<token>/orders/<int:order_id>/prep")
+def update_prep_time(kitchen_id: str, token: str, order_id: int):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_chef_token(kitchen, token):
         return jsonify({"error": "Not found"}), 404
     payload = request.get_json(silent=True) or {}
     minutes_value = payload.get("minutes")
@@ -840,36 +2091,40 @@ def update_prep_time(token: str, order_id: int):
     if minutes <= 0 or minutes > 240:
         return jsonify({"error": "Minutes out of range"}), 400
 
-    order = next((item for item in ORDERS if item["id"] == order_id), None)
+    order = next((item for item in kitchen["orders"] if item["id"] == order_id), None)
     if not order:
         return jsonify({"error": "Order not found"}), 404
-    if order.get("status") == "Cancelled":
-        return jsonify({"error": "Order cancelled"}), 400
 
-    order["prep_minutes"] = minutes
-    order["prep_started_at"] = now_iso()
-    order["status"] = "Preparing"
+    with kitchen["lock"]:
+        if order.get("status") == "Cancelled":
+            return jsonify({"error": "Order cancelled"}), 400
+        order["prep_minutes"] = minutes
+        order["prep_started_at"] = now_iso()
+        order["status"] = "Preparing"
+        touch_order(kitchen, order)
     return jsonify(order)
 
 
-@app.get("/api/employee/<token>/presets")
-def employee_presets(token: str):
-    if not is_employee_token(token):
+@kitchen_get("/api/employee/<token>/presets")
+def employee_presets(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_employee_token(token):
         return jsonify({"error": "Not found"}), 404
-    return jsonify(PRESETS)
+    return jsonify(kitchen["presets"])
 
 
-@app.get("/api/chef/<token>/presets")
-def chef_presets(token: str):
-    if not is_chef_token(token):
+@kitchen_get("/api/chef/<token>/presets")
+def chef_presets(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_chef_token(kitchen, token):
         return jsonify({"error": "Not found"}), 404
-    return jsonify(PRESETS)
+    return jsonify(kitchen["presets"])
 
 
-@app.post("/api/chef/<token>/presets")
-def add_preset(token: str):
-    global NEXT_PRESET_ID
-    if not is_chef_token(token):
+@kitchen_post("/api/chef/<token>/presets")
+def add_preset(kitchen_id: str, token: str):
+    kitchen = get_kitchen(kitchen_id)
+    if not kitchen or not is_chef_token(kitchen, token):
         return jsonify({"error": "Not found"}), 404
     payload = request.get_json(silent=True) or {}
     name = str(payload.get("name", "")).strip()
@@ -879,17 +2134,19 @@ def add_preset(token: str):
         return jsonify({"error": "Name and order are required"}), 400
 
     preset = {
-        "id": NEXT_PRESET_ID,
         "name": name,
         "order_text": order_text,
+        "order_items": match_menu_items(kitchen, order_text),
         "requirements": requirements,
     }
-    PRESETS.append(preset)
-    NEXT_PRESET_ID += 1
+    with kitchen["lock"]:
+        preset["id"] = kitchen["next_preset_id"]
+        kitchen["next_preset_id"] += 1
+        kitchen["presets"].append(preset)
     return jsonify(preset), 201
 
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "5000"))
     debug = os.getenv("FLASK_DEBUG", "1") == "1"
-    app.run(host="0.0.0.0", port=port, debug=debug)
+    create_app().run(host="0.0.0.0", port=port, debug=debug)
@@ -14,7 +14,7 @@ const SOUND_KEY = "chefSoundEnabled";
 const LUNCH_KEY = "lunchReadyState";
 const RING_SEEN_KEY = "chefRingSeenIds";
 const PRED_SEEN_KEY = "chefLunchPredictionSeen";
-let lastSeenId = null;
+let seenOrderIds = null;
 let notificationTimer;
 
 const formatTimestamp = (order) => {
@@ -26,128 +26,277 @@ const formatTimestamp = (order) => {
   return order?.created_at || "";
 };
 
-const renderOrders = (orders) => {
-  if (!orderList) {
-    return;
+// Cards are keyed by order id and patched in place, so prep inputs keep their
+// focus and typed value and voice clips are not re-fetched on every refresh.
+const FRAME_BUDGET_MS = 8;
+const orderCards = new Map();
+let renderToken = 0;
+
+const createElement = (tag, className, text) => {
+  const element = document.createElement(tag);
+  if (className) {
+    element.className = className;
   }
+  if (text !== undefined) {
+    element.textContent = text;
+  }
+  return element;
+};
 
-  orderList.replaceChildren();
-  if (!orders || orders.length === 0) {
-    return;
+const orderSignature = (order) =>
+  JSON.stringify([
+    order.status,
+    order.prep_minutes,
+    order.order_text,
+    order.requirements,
+    order.mate_name,
+    order.voice_filename,
+    order.suggested_eta,
+    order.employee_name,
+    order.created_at_iso,
+    order.pickup_at,
+  ]);
+
+const createOrderCard = (order) => {
+  const card = createElement("div", "card card-hero order-card");
+  if (order.id) {
+    card.dataset.orderId = order.id;
+  }
+  const header = createElement("div", "card-header");
+  const name = createElement("strong");
+  const status = createElement("span");
+  name.dataset.field = "name";
+  status.dataset.field = "status";
+  header.appendChild(name);
+  header.appendChild(status);
+  const time = createElement("div", "muted");
+  const pickup = createElement("p", "muted hidden");
+  const mate = createElement("p", "muted hidden");
+  const text = createElement("p");
+  const req = createElement("p", "muted hidden");
+  time.dataset.field = "time";
+  pickup.dataset.field = "pickup";
+  mate.dataset.field = "mate";
+  text.dataset.field = "text";
+  req.dataset.field = "req";
+
+  const prepControls = createElement("div", "prep-controls");
+  prepControls.dataset.field = "prep-controls";
+  const prepLabel = createElement("label", "", "Prep (min)");
+  prepLabel.htmlFor = `prep-${order.id || "new"}`;
+  const prepInput = document.createElement("input");
+  prepInput.type = "number";
+  prepInput.min = "1";
+  prepInput.max = "240";
+  prepInput.placeholder = "20";
+  prepInput.id = `prep-${order.id || "new"}`;
+  prepInput.dataset.field = "prep-input";
+  const prepButton = createElement("button", "", "Start prep");
+  prepButton.type = "button";
+  prepButton.dataset.prep = "true";
+  prepButton.dataset.orderId = order.id;
+  const etaChip = createElement("span", "chip hidden");
+  const etaButton = createElement("button", "hidden", "Use ETA");
+  etaButton.type = "button";
+  etaButton.dataset.useEta = "true";
+  etaButton.dataset.orderId = order.id;
+  etaChip.dataset.field = "eta-chip";
+  etaButton.dataset.field = "eta-button";
+  prepControls.appendChild(prepLabel);
+  prepControls.appendChild(prepInput);
+  prepControls.appendChild(prepButton);
+  prepControls.appendChild(etaChip);
+  prepControls.appendChild(etaButton);
+
+  const actions = createElement("div", "status-actions");
+  actions.dataset.field = "actions";
+  const statusButtons = ["Preparing", "Ready", "Delivered"].map((label) => {
+    const button = createElement("button", "", label);
+    button.type = "button";
+    button.dataset.status = label;
+    button.dataset.orderId = order.id;
+    actions.appendChild(button);
+    return button;
+  });
+
+  [header, time, pickup, mate, text, req, prepControls, actions].forEach((child) =>
+    card.appendChild(child)
+  );
+  return {
+    card,
+    signature: "",
+    refs: { name, status, time, pickup, mate, text, req, prepControls, prepInput, etaChip, etaButton, actions, statusButtons, audio: null },
+  };
+};
+
+// Server-rendered cards (views/chef_order_card.html) carry the same
+// data-field hooks, so the first refresh patches them instead of rebuilding.
+const adoptOrderCard = (card) => {
+  const field = (name) => card.querySelector(`[data-field="${name}"]`);
+  const refs = {
+    name: field("name"),
+    status: field("status"),
+    time: field("time"),
+    pickup: field("pickup"),
+    mate: field("mate"),
+    text: field("text"),
+    req: field("req"),
+    prepControls: field("prep-controls"),
+    prepInput: field("prep-input"),
+    etaChip: field("eta-chip"),
+    etaButton: field("eta-button"),
+    actions: field("actions"),
+    statusButtons: Array.from(card.querySelectorAll("button[data-status]")),
+    audio: card.querySelector("audio"),
+  };
+  const { audio, statusButtons, ...required } = refs;
+  if (Object.values(required).some((ref) => !ref) || statusButtons.length === 0) {
+    return null;
+  }
+  return { card, signature: "", refs };
+};
+
+if (orderList) {
+  Array.from(orderList.children).forEach((card) => {
+    const entry = card.dataset.orderId ? adoptOrderCard(card) : null;
+    if (entry) {
+      orderCards.set(card.dataset.orderId, entry);
+    }
+  });
+}
+
+const setOptionalText = (element, value) => {
+  element.textContent = value || "";
+  element.classList.toggle("hidden", !value);
+};
+
+const patchOrderCard = (entry, order) => {
+  const { card, refs } = entry;
+  const statusValue = order.status || "Pending";
+  refs.name.textContent = order.employee_name || "";
+  refs.status.className = `status-pill status-${statusValue.toLowerCase()}`;
+  refs.status.textContent = statusValue;
+  refs.time.textContent = formatTimestamp(order);
+  let pickupText = "";
+  if (order.pickup_at) {
+    const pickupMs = Date.parse(order.pickup_at);
+    pickupText = `Pickup: ${Number.isFinite(pickupMs) ? new Date(pickupMs).toLocaleTimeString() : order.pickup_at}`;
+  }
+  setOptionalText(refs.pickup, pickupText);
+  setOptionalText(refs.mate, order.mate_name ? `For: ${order.mate_name}` : "");
+  refs.text.textContent = order.order_text || "";
+  setOptionalText(refs.req, order.requirements ? `Requirements: ${order.requirements}` : "");
+
+  const voiceSrc = order.voice_filename ? `/static/voice/${order.voice_filename}` : "";
+  if (voiceSrc && refs.audio?.dataset.src !== voiceSrc) {
+    const audio = createElement("audio");
+    audio.controls = true;
+    audio.src = voiceSrc;
+    audio.dataset.src = voiceSrc;
+    if (refs.audio) {
+      refs.audio.replaceWith(audio);
+    } else {
+      card.insertBefore(audio, refs.text);
+    }
+    refs.audio = audio;
+  } else if (!voiceSrc && refs.audio) {
+    refs.audio.remove();
+    refs.audio = null;
+  }
+
+  const active = !["Delivered", "Cancelled"].includes(statusValue);
+  refs.prepControls.classList.toggle("hidden", !active);
+  refs.actions.classList.toggle("hidden", !active);
+  const input = refs.prepInput;
+  if (document.activeElement !== input && input.dataset.dirty !== "true") {
+    input.value = order.prep_minutes || "";
+  }
+  setOptionalText(refs.etaChip, order.suggested_eta ? `Suggested: ${order.suggested_eta} min` : "");
+  refs.etaButton.classList.toggle("hidden", !order.suggested_eta);
+  refs.etaButton.dataset.eta = order.suggested_eta || "";
+  refs.statusButtons.forEach((button) => {
+    button.disabled = button.dataset.status === statusValue || !active;
+  });
+};
+
+const upsertOrderCard = (order) => {
+  const key = String(order.id);
+  let entry = orderCards.get(key);
+  if (!entry) {
+    entry = createOrderCard(order);
+    orderCards.set(key, entry);
   }
+  const signature = orderSignature(order);
+  if (entry.signature !== signature) {
+    patchOrderCard(entry, order);
+    entry.signature = signature;
+  }
+  return entry.card;
+};
+
+const placeOrderCards = (cards) => {
+  const keep = new Set(cards);
+  Array.from(orderList.children).forEach((child) => {
+    if (!keep.has(child)) {
+      child.remove();
+    }
+  });
+  orderCards.forEach((entry, key) => {
+    if (!keep.has(entry.card)) {
+      orderCards.delete(key);
+    }
+  });
+  let cursor = orderList.firstElementChild;
+  cards.forEach((card) => {
+    if (card === cursor) {
+      cursor = cursor.nextElementSibling;
+    } else {
+      orderList.insertBefore(card, cursor);
+    }
+  });
+};
 
+const renderOrders = (orders) => {
+  if (!orderList) {
+    return;
+  }
   const now = Date.now();
-  orders.forEach((order) => {
-    if (order.status === "Cancelled") {
-      const cancelledAt = order.cancelled_at ? Date.parse(order.cancelled_at) : NaN;
-      if (Number.isFinite(cancelledAt) && now - cancelledAt > 60000) {
+  const visible = (orders || []).filter((order) => {
+    if (order.status !== "Cancelled") {
+      return true;
+    }
+    const cancelledAt = order.cancelled_at ? Date.parse(order.cancelled_at) : NaN;
+    return !(Number.isFinite(cancelledAt) && now - cancelledAt > 60000);
+  });
+
+  // Patch cards within a per-frame budget; a newer refresh supersedes this one.
+  renderToken += 1;
+  const token = renderToken;
+  const cards = [];
+  const step = () => {
+    if (token !== renderToken) {
+      return;
+    }
+    const started = performance.now();
+    while (cards.length < visible.length) {
+      cards.push(upsertOrderCard(visible[cards.length]));
+      if (performance.now() - started > FRAME_BUDGET_MS && cards.length < visible.length) {
+        requestAnimationFrame(step);
         return;
       }
     }
-    const card = document.createElement("div");
-    card.className = "card card-hero order-card";
-    if (order.id) {
-      card.dataset.orderId = order.id;
-    }
-
-    const header = document.createElement("div");
-    header.className = "card-header";
-
-    const name = document.createElement("strong");
-    name.textContent = order.employee_name || "";
-
-    const status = document.createElement("span");
-    const statusValue = order.status || "Pending";
-    status.className = `status-pill status-${statusValue.toLowerCase()}`;
-    status.textContent = statusValue;
-
-    const time = document.createElement("div");
-    time.className = "muted";
-    time.textContent = formatTimestamp(order);
-
-    const text = document.createElement("p");
-    text.textContent = order.order_text || "";
-
-    header.appendChild(name);
-    header.appendChild(status);
-    card.appendChild(header);
-    card.appendChild(time);
-    if (order.mate_name) {
-      const mate = document.createElement("p");
-      mate.className = "muted";
-      mate.textContent = `For: ${order.mate_name}`;
-      card.appendChild(mate);
-    }
-    if (order.voice_filename) {
-      const audio = document.createElement("audio");
-      audio.controls = true;
-      audio.src = `/static/voice/${order.voice_filename}`;
-      card.appendChild(audio);
-    }
-    card.appendChild(text);
-    if (order.requirements) {
-      const req = document.createElement("p");
-      req.className = "muted";
-      req.textContent = `Requirements: ${order.requirements}`;
-      card.appendChild(req);
-    }
-
-    if (!["Delivered", "Cancelled"].includes(statusValue)) {
-      const prepControls = document.createElement("div");
-      prepControls.className = "prep-controls";
-      const prepLabel = document.createElement("label");
-      prepLabel.textContent = "Prep (min)";
-      prepLabel.htmlFor = `prep-${order.id || "new"}`;
-      const prepInput = document.createElement("input");
-      prepInput.type = "number";
-      prepInput.min = "1";
-      prepInput.max = "240";
-      prepInput.placeholder = "20";
-      prepInput.id = `prep-${order.id || "new"}`;
-      prepInput.value = order.prep_minutes || "";
-      const prepButton = document.createElement("button");
-      prepButton.type = "button";
-      prepButton.textContent = "Start prep";
-      prepButton.dataset.prep = "true";
-      prepButton.dataset.orderId = order.id;
-      prepControls.appendChild(prepLabel);
-      prepControls.appendChild(prepInput);
-      prepControls.appendChild(prepButton);
-      if (order.suggested_eta) {
-        const etaChip = document.createElement("span");
-        etaChip.className = "chip";
-        etaChip.textContent = `Suggested: ${order.suggested_eta} min`;
-        const etaButton = document.createElement("button");
-        etaButton.type = "button";
-        etaButton.textContent = "Use ETA";
-        etaButton.dataset.useEta = "true";
-        etaButton.dataset.eta = order.suggested_eta;
-        etaButton.dataset.orderId = order.id;
-        prepControls.appendChild(etaChip);
-        prepControls.appendChild(etaButton);
-      }
-      card.appendChild(prepControls);
-    }
-
-    if (!["Delivered", "Cancelled"].includes(statusValue)) {
-      const actions = document.createElement("div");
-      actions.className = "status-actions";
-      ["Preparing", "Ready", "Delivered"].forEach((label) => {
-        const button = document.createElement("button");
-        button.type = "button";
-        button.textContent = label;
-        button.dataset.status = label;
-        button.dataset.orderId = order.id;
-        if (label === statusValue || statusValue === "Delivered" || statusValue === "Cancelled") {
-          button.disabled = true;
-        }
-        actions.appendChild(button);
-      });
-      card.appendChild(actions);
+    placeOrderCards(cards);
+  };
+  step();
+};
+
+if (orderList) {
+  orderList.addEventListener("input", (event) => {
+    if (event.target instanceof HTMLInputElement && event.target.type === "number") {
+      event.target.dataset.dirty = "true";
     }
-    orderList.appendChild(card);
   });
-};
+}
 
 const normalizeItemName = (value) =>
   (value || "").toLowerCase().replace(/\s+/g, " ").trim();
@@ -396,13 +545,14 @@ const handleNewOrders = (orders) => {
   if (ids.length === 0) {
     return;
   }
-  const newestId = Math.max(...ids);
-  if (lastSeenId === null) {
-    lastSeenId = newestId;
+  // Released pre-orders keep their original (lower) id, so track every id seen.
+  if (seenOrderIds === null) {
+    seenOrderIds = new Set(ids);
     return;
   }
-  if (newestId > lastSeenId) {
-    lastSeenId = newestId;
+  const hasNew = ids.some((id) => !seenOrderIds.has(id));
+  ids.forEach((id) => seenOrderIds.add(id));
+  if (hasNew) {
     showNotification();
     if (getSoundEnabled()) {
       playChime();
@@ -412,7 +562,7 @@ const handleNewOrders = (orders) => {
 
 const refreshOrders = async () => {
   try {
-    const response = await fetch(`${apiBase}/orders`, { cache: "no-store" });
+    const response = await pollFetch(`${apiBase}/orders`, { cache: "no-store" });
     if (!response.ok) {
       return;
     }
@@ -433,7 +583,7 @@ const refreshLunchReady = async () => {
     return;
   }
   try {
-    const response = await fetch(`${apiBase}/lunch-ready`, { cache: "no-store" });
+    const response = await pollFetch(`${apiBase}/lunch-ready`, { cache: "no-store" });
     if (!response.ok) {
       return;
     }
@@ -450,7 +600,7 @@ if (lunchReadyToggle) {
   lunchReadyToggle.addEventListener("change", async () => {
     const ready = lunchReadyToggle.checked;
     try {
-      const response = await fetch(`${apiBase}/lunch-ready`, {
+      const response = await fetchWithRetry(`${apiBase}/lunch-ready`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ ready }),
@@ -476,7 +626,7 @@ const refreshChefMenu = async () => {
     return;
   }
   try {
-    const response = await fetch(`${apiBase}/menu`, { cache: "no-store" });
+    const response = await pollFetch(`${apiBase}/menu`, { cache: "no-store" });
     if (!response.ok) {
       return;
     }
@@ -502,7 +652,7 @@ if (chefMenuGrid) {
       return;
     }
     try {
-      const response = await fetch(`${apiBase}/menu/availability`, {
+      const response = await fetchWithRetry(`${apiBase}/menu/availability`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ name, available: target.checked }),
@@ -533,7 +683,7 @@ const setSeenRingIds = (ids) => {
 
 const refreshRings = async () => {
   try {
-    const response = await fetch(`${apiBase}/rings`, { cache: "no-store" });
+    const response = await pollFetch(`${apiBase}/rings`, { cache: "no-store" });
     if (!response.ok) {
       return;
     }
@@ -577,7 +727,7 @@ const refreshLunchCheckins = async () => {
     return;
   }
   try {
-    const response = await fetch(`${apiBase}/lunch-checkins`, { cache: "no-store" });
+    const response = await pollFetch(`${apiBase}/lunch-checkins`, { cache: "no-store" });
     if (!response.ok) {
       return;
     }
@@ -612,7 +762,10 @@ const refreshLunchPrediction = async () => {
     return;
   }
   try {
-    const response = await fetch(`${apiBase}/lunch-prediction`, { cache: "no-store" });
+    const response = await pollFetch(`${apiBase}/lunch-prediction`, { cache: "no-store" });
+    if (retryWhenShed(response, refreshLunchPrediction)) {
+      return;
+    }
     if (!response.ok) {
       return;
     }
@@ -668,6 +821,7 @@ document.addEventListener("click", async (event) => {
       const eta = Number(etaButton.dataset.eta);
       if (input && Number.isFinite(eta)) {
         input.value = eta;
+        input.dataset.dirty = "true";
       }
       return;
     }
@@ -681,12 +835,13 @@ document.addEventListener("click", async (event) => {
         return;
       }
       try {
-        const response = await fetch(`${apiBase}/orders/${orderId}/prep`, {
+        const response = await fetchWithRetry(`${apiBase}/orders/${orderId}/prep`, {
           method: "POST",
           headers: { "Content-Type": "application/json" },
           body: JSON.stringify({ minutes }),
         });
         if (response.ok) {
+          delete input.dataset.dirty;
           refreshOrders();
         }
       } catch (error) {
@@ -702,7 +857,7 @@ document.addEventListener("click", async (event) => {
         return;
       }
       try {
-        const response = await fetch(`${apiBase}/orders/${orderId}/status`, {
+        const response = await fetchWithRetry(`${apiBase}/orders/${orderId}/status`, {
           method: "POST",
           headers: { "Content-Type": "application/json" },
           body: JSON.stringify({ status }),
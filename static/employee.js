@@ -1,4 +1,6 @@
 const presetList = document.getElementById("preset-list");
+const favoriteList = document.getElementById("favorite-list");
+const favoritesWrapper = document.getElementById("favorites-wrapper");
 const menuGrid = document.querySelector(".menu-grid");
 const cartList = document.getElementById("cart-list");
 const cartInput = document.getElementById("order_items_json");
@@ -23,6 +25,8 @@ const voicePreview = document.getElementById("voice-preview");
 const voiceInput = document.getElementById("voice_message");
 const orderForm = document.querySelector(".order-form");
 const isSleeping = orderForm?.dataset.sleeping === "true";
+const pickupSlot = document.getElementById("pickup_slot");
+const submitButton = orderForm?.querySelector("button[type='submit']");
 let mediaRecorder;
 let recordedChunks = [];
 let recordedBlob = null;
@@ -173,7 +177,7 @@ const refreshMenu = async () => {
     return;
   }
   try {
-    const response = await fetch(`${apiBase}/menu`, { cache: "no-store" });
+    const response = await pollFetch(`${apiBase}/menu`, { cache: "no-store" });
     if (!response.ok) {
       return;
     }
@@ -198,7 +202,12 @@ const renderPresets = (presets) => {
     button.className = "preset-button";
     button.textContent = preset.name;
     button.addEventListener("click", () => {
-      if (preset.order_text) {
+      if (preset.order_items && preset.order_items.length) {
+        preset.order_items.forEach((item) => {
+          cart.set(item.name, (cart.get(item.name) || 0) + item.qty);
+        });
+        renderCart();
+      } else if (preset.order_text) {
         cart.set(preset.order_text, (cart.get(preset.order_text) || 0) + 1);
         renderCart();
       }
@@ -219,7 +228,10 @@ const refreshPresets = async () => {
     return;
   }
   try {
-    const response = await fetch(`${apiBase}/presets`, { cache: "no-store" });
+    const response = await pollFetch(`${apiBase}/presets`, { cache: "no-store" });
+    if (retryWhenShed(response, refreshPresets)) {
+      return;
+    }
     if (!response.ok) {
       return;
     }
@@ -230,10 +242,116 @@ const refreshPresets = async () => {
   }
 };
 
+const renderFavorites = (favorites) => {
+  if (!favoriteList) {
+    return;
+  }
+  favoriteList.replaceChildren();
+  if (favoritesWrapper) {
+    favoritesWrapper.classList.toggle("hidden", !favorites || favorites.length === 0);
+  }
+  (favorites || []).forEach((favorite) => {
+    const button = document.createElement("button");
+    button.type = "button";
+    button.className = "preset-button";
+    button.textContent = favorite.label;
+    button.addEventListener("click", () => {
+      cart.clear();
+      favorite.order_items.forEach((item) => {
+        cart.set(item.name, item.qty);
+      });
+      renderCart();
+    });
+    favoriteList.appendChild(button);
+  });
+};
+
+const refreshFavorites = async () => {
+  if (!favoriteList) {
+    return;
+  }
+  const apiBase = favoriteList.dataset.apiBase;
+  if (!apiBase) {
+    return;
+  }
+  try {
+    const response = await pollFetch(`${apiBase}/favorites`, { cache: "no-store" });
+    if (retryWhenShed(response, refreshFavorites)) {
+      return;
+    }
+    if (!response.ok) {
+      return;
+    }
+    const data = await response.json();
+    renderFavorites(data);
+  } catch (error) {
+    // Ignore transient network errors.
+  }
+};
+
+const updateSubmitState = () => {
+  if (submitButton && isSleeping) {
+    submitButton.disabled = !pickupSlot?.value;
+  }
+};
+
+const renderPickupSlots = (slots) => {
+  if (!pickupSlot) {
+    return;
+  }
+  const selected = pickupSlot.value;
+  const first = pickupSlot.options[0];
+  pickupSlot.replaceChildren(first);
+  (slots || []).forEach((slot) => {
+    const option = document.createElement("option");
+    option.value = slot.slot;
+    option.textContent = slot.remaining > 0 ? slot.label : `${slot.label} (full)`;
+    option.disabled = slot.remaining <= 0;
+    pickupSlot.appendChild(option);
+  });
+  pickupSlot.value = selected;
+  if (pickupSlot.value !== selected) {
+    pickupSlot.value = "";
+  }
+  updateSubmitState();
+};
+
+const refreshPickupSlots = async () => {
+  if (!pickupSlot) {
+    return;
+  }
+  const apiBase = pickupSlot.dataset.apiBase;
+  if (!apiBase) {
+    return;
+  }
+  try {
+    const response = await pollFetch(`${apiBase}/pickup-slots`, { cache: "no-store" });
+    if (!response.ok) {
+      return;
+    }
+    const data = await response.json();
+    renderPickupSlots(data);
+  } catch (error) {
+    // Ignore transient network errors.
+  }
+};
+
+if (pickupSlot) {
+  pickupSlot.addEventListener("change", updateSubmitState);
+}
+
 refreshPresets();
+refreshFavorites();
 refreshMenu();
+refreshPickupSlots();
 renderCart();
 setInterval(refreshMenu, 15000);
+setInterval(refreshPickupSlots, 60000);
+
+const newIdempotencyKey = () =>
+  window.crypto?.randomUUID
+    ? window.crypto.randomUUID()
+    : `${Date.now()}-${Math.random().toString(16).slice(2)}`;
 
 const playChime = () => {
   try {
@@ -290,7 +408,7 @@ const refreshLunchReady = async () => {
     return;
   }
   try {
-    const response = await fetch(`${apiBase}/lunch-ready`, { cache: "no-store" });
+    const response = await pollFetch(`${apiBase}/lunch-ready`, { cache: "no-store" });
     if (!response.ok) {
       return;
     }
@@ -354,7 +472,7 @@ const refreshMateOrders = async () => {
     return;
   }
   try {
-    const response = await fetch(`${apiBase}/mate-orders`, { cache: "no-store" });
+    const response = await pollFetch(`${apiBase}/mate-orders`, { cache: "no-store" });
     if (!response.ok) {
       return;
     }
@@ -450,7 +568,7 @@ const refreshMyOrders = async () => {
     return;
   }
   try {
-    const response = await fetch(`${apiBase}/my-orders`, { cache: "no-store" });
+    const response = await pollFetch(`${apiBase}/my-orders`, { cache: "no-store" });
     if (!response.ok) {
       return;
     }
@@ -479,13 +597,16 @@ if (ringButton) {
       return;
     }
     try {
-      const response = await fetch(`${apiBase}/ring`, {
+      const response = await fetchWithRetry(`${apiBase}/ring`, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: { "Content-Type": "application/json", "Idempotency-Key": newIdempotencyKey() },
       });
       if (response.ok) {
         if (ringBanner) {
-          ringBanner.textContent = "Chef has been notified.";
+          ringBanner.textContent =
+            response.status === 202
+              ? "You are offline. Chef will be notified when you reconnect."
+              : "Chef has been notified.";
           ringBanner.classList.remove("hidden");
         }
         playChime();
@@ -594,10 +715,16 @@ setupVoiceRecording();
 
 if (orderForm) {
   orderForm.addEventListener("submit", async (event) => {
-    if (isSleeping) {
+    if (isSleeping && !pickupSlot?.value) {
       event.preventDefault();
       return;
     }
+    // One key per submission, not per page render: a page restored from the
+    // back/forward cache must not replay the order it already placed.
+    const idempotencyInput = document.getElementById("idempotency_key");
+    if (idempotencyInput) {
+      idempotencyInput.value = newIdempotencyKey();
+    }
     if (!recordedBlob) {
       return;
     }
@@ -607,12 +734,22 @@ if (orderForm) {
       formData.set("voice_message", recordedBlob, "voice_message.webm");
     }
     try {
-      const response = await fetch(orderForm.action, {
+      const response = await fetchWithRetry(orderForm.action, {
         method: "POST",
+        headers: { "Idempotency-Key": formData.get("idempotency_key") || newIdempotencyKey() },
         body: formData,
       });
-      if (response.ok) {
+      if (response.status === 202) {
+        window.location.href = "/static/queued.html";
+      } else if (response.ok) {
         window.location.href = response.url;
+      } else {
+        const payload = await response.json().catch(() => ({}));
+        const orderError = document.getElementById("order-error");
+        if (orderError) {
+          orderError.textContent = payload.error || "Could not place the order. Please try again.";
+          orderError.classList.remove("hidden");
+        }
       }
     } catch (error) {
       // Ignore transient network errors.
@@ -635,9 +772,9 @@ document.addEventListener("click", async (event) => {
     return;
   }
   try {
-    const response = await fetch(`${apiBase}/orders/${orderId}/cancel`, {
+    const response = await fetchWithRetry(`${apiBase}/orders/${orderId}/cancel`, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: { "Content-Type": "application/json", "Idempotency-Key": newIdempotencyKey() },
     });
     if (response.ok) {
       refreshMateOrders();
@@ -657,7 +794,10 @@ const refreshLunchCheckin = async () => {
     return;
   }
   try {
-    const response = await fetch(`${apiBase}/lunch-checkin`, { cache: "no-store" });
+    const response = await pollFetch(`${apiBase}/lunch-checkin`, { cache: "no-store" });
+    if (retryWhenShed(response, refreshLunchCheckin)) {
+      return;
+    }
     if (!response.ok) {
       return;
     }
@@ -675,7 +815,7 @@ if (lunchCheckin) {
       return;
     }
     try {
-      const response = await fetch(`${apiBase}/lunch-checkin`, {
+      const response = await fetchWithRetry(`${apiBase}/lunch-checkin`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ took: lunchCheckin.checked }),
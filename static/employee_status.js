@@ -15,7 +15,10 @@ const mateOrdersList = document.getElementById("mate-orders-list");
 const LUNCH_SEEN_KEY = "lunchReadySeenAt";
 const MATE_SEEN_KEY = "mateOrderSeenIds";
 
+const pickupTime = document.getElementById("pickup-time");
+
 const statusMessages = {
+  Scheduled: "Pre-order booked. It goes to the chef ahead of your pickup time.",
   Pending: "Chef has received your order.",
   Preparing: "Chef is preparing your order.",
   Ready: "Order is ready for pickup/delivery.",
@@ -36,6 +39,12 @@ const updateStatusUi = (order) => {
     cancelButton.disabled = disabled;
     cancelButton.classList.toggle("hidden", disabled);
   }
+  if (pickupTime) {
+    const parsed = Date.parse(order.pickup_at || pickupTime.dataset.pickupIso || "");
+    if (Number.isFinite(parsed)) {
+      pickupTime.textContent = `Pickup: ${new Date(parsed).toLocaleString()}`;
+    }
+  }
   if (orderTime) {
     const iso = order.created_at_iso || orderTime.dataset.createdIso || order.created_at;
     const parsed = iso ? Date.parse(iso) : NaN;
@@ -78,6 +87,11 @@ const updateStatusUi = (order) => {
   }
 };
 
+const newIdempotencyKey = () =>
+  window.crypto?.randomUUID
+    ? window.crypto.randomUUID()
+    : `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+
 const playChime = () => {
   try {
     const audio = new (window.AudioContext || window.webkitAudioContext)();
@@ -133,7 +147,7 @@ const refreshLunchReady = async () => {
     return;
   }
   try {
-    const response = await fetch(`${apiBase}/lunch-ready`, { cache: "no-store" });
+    const response = await pollFetch(`${apiBase}/lunch-ready`, { cache: "no-store" });
     if (!response.ok) {
       return;
     }
@@ -185,7 +199,7 @@ const refreshMateOrders = async () => {
     return;
   }
   try {
-    const response = await fetch(`${apiBase}/mate-orders`, { cache: "no-store" });
+    const response = await pollFetch(`${apiBase}/mate-orders`, { cache: "no-store" });
     if (!response.ok) {
       return;
     }
@@ -250,7 +264,7 @@ const refreshStatus = async () => {
     return;
   }
   try {
-    const response = await fetch(`${apiBase}/orders/${orderId}`, { cache: "no-store" });
+    const response = await pollFetch(`${apiBase}/orders/${orderId}`, { cache: "no-store" });
     if (!response.ok) {
       return;
     }
@@ -278,13 +292,16 @@ if (ringButton) {
       return;
     }
     try {
-      const response = await fetch(`${apiBase}/ring`, {
+      const response = await fetchWithRetry(`${apiBase}/ring`, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: { "Content-Type": "application/json", "Idempotency-Key": newIdempotencyKey() },
       });
       if (response.ok) {
         if (ringBanner) {
-          ringBanner.textContent = "Chef has been notified.";
+          ringBanner.textContent =
+            response.status === 202
+              ? "You are offline. Chef will be notified when you reconnect."
+              : "Chef has been notified.";
           ringBanner.classList.remove("hidden");
         }
         playChime();
@@ -308,9 +325,9 @@ document.addEventListener("click", async (event) => {
     return;
   }
   try {
-    const response = await fetch(`${apiBase}/orders/${orderId}/cancel`, {
+    const response = await fetchWithRetry(`${apiBase}/orders/${orderId}/cancel`, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: { "Content-Type": "application/json", "Idempotency-Key": newIdempotencyKey() },
     });
     if (response.ok) {
       refreshStatus();
@@ -0,0 +1,49 @@
+// Shared by the page scripts. When the server sheds load (429/503 with
+// Retry-After), every poll on the page pauses with exponential, jittered
+// backoff so clients do not all come back at the same moment.
+const pollBackoff = { until: 0, failures: 0 };
+const MAX_POLL_BACKOFF_STEPS = 5;
+
+const pollFetch = async (url, options) => {
+  if (Date.now() < pollBackoff.until) {
+    return new Response(null, { status: 429 });
+  }
+  const response = await fetch(url, options);
+  if (response.status === 429 || response.status === 503) {
+    const retryAfter = Number(response.headers.get("Retry-After")) || 2;
+    pollBackoff.failures = Math.min(pollBackoff.failures + 1, MAX_POLL_BACKOFF_STEPS);
+    const delay = retryAfter * 1000 * 2 ** (pollBackoff.failures - 1);
+    pollBackoff.until = Date.now() + delay * (0.5 + Math.random());
+  } else if (response.ok) {
+    pollBackoff.failures = 0;
+  }
+  return response;
+};
+
+// Writes are retried a few times after a 503, waiting out Retry-After with
+// jitter. Callers only use this for idempotent requests.
+const MAX_WRITE_RETRIES = 3;
+
+const fetchWithRetry = async (url, options) => {
+  for (let attempt = 0; ; attempt += 1) {
+    const response = await fetch(url, options);
+    if (response.status !== 503 || attempt >= MAX_WRITE_RETRIES) {
+      return response;
+    }
+    const retryAfter = Number(response.headers.get("Retry-After")) || 1;
+    await new Promise((resolve) => {
+      setTimeout(resolve, retryAfter * 1000 * (0.5 + Math.random()));
+    });
+  }
+};
+
+// Loads that run once (page setup) or rarely (hourly) would stay empty after
+// being shed, so they are run again once the backoff is over.
+const retryWhenShed = (response, load) => {
+  if (response.status !== 429 && response.status !== 503) {
+    return false;
+  }
+  const wait = Math.max(pollBackoff.until - Date.now(), 0);
+  setTimeout(load, wait + 1000 * Math.random());
+  return true;
+};
@@ -1,6 +1,13 @@
-const CACHE_NAME = "desk-order-v3";
+const CACHE_NAME = "desk-order-v6";
+const OUTBOX_DB = "desk-order-outbox";
+const OUTBOX_STORE = "requests";
+const SYNC_TAG = "desk-order-outbox";
+// Matches IDEMPOTENCY_TTL_SECONDS on the server: an older replay could be
+// applied twice, so it is dropped instead.
+const OUTBOX_TTL_MS = 12 * 60 * 60 * 1000;
 const ASSETS = [
   "/offline.html",
+  "/static/queued.html",
   "/static/manifest.json",
   "/static/food_hero.svg",
   "/static/welcome_hero.svg",
@@ -9,8 +16,156 @@ const ASSETS = [
   "/static/employee.js",
   "/static/employee_status.js",
   "/static/chef.js",
+  "/static/poll.js",
   "/static/icons/icon.svg",
 ];
+// Order, ring and cancel submissions are queued while offline and replayed later.
+// Each carries an idempotency key, so the server ignores duplicate replays.
+const QUEUEABLE_PATHS = [
+  /\/employee\/[^/]+\/order$/,
+  /\/api\/employee\/[^/]+\/ring$/,
+  /\/api\/employee\/[^/]+\/orders\/\d+\/cancel$/,
+];
+
+const openOutbox = () =>
+  new Promise((resolve, reject) => {
+    const request = indexedDB.open(OUTBOX_DB, 1);
+    request.onupgradeneeded = () => {
+      request.result.createObjectStore(OUTBOX_STORE, { keyPath: "id", autoIncrement: true });
+    };
+    request.onsuccess = () => resolve(request.result);
+    request.onerror = () => reject(request.error);
+  });
+
+const outboxTransaction = async (mode, action) => {
+  const db = await openOutbox();
+  return new Promise((resolve, reject) => {
+    const tx = db.transaction(OUTBOX_STORE, mode);
+    const result = action(tx.objectStore(OUTBOX_STORE));
+    tx.oncomplete = () => {
+      db.close();
+      resolve(result?.result);
+    };
+    tx.onerror = () => {
+      db.close();
+      reject(tx.error);
+    };
+  });
+};
+
+const enqueueRequest = async (request) => {
+  const headers = {};
+  request.headers.forEach((value, key) => {
+    headers[key] = value;
+  });
+  const body = await request.blob();
+  // Plain form posts carry their key in the body; send it as a header on
+  // replay so the server reports failures with a non-2xx status.
+  if (!headers["idempotency-key"] && body.size) {
+    try {
+      const form = await new Response(body, {
+        headers: { "Content-Type": headers["content-type"] || "" },
+      }).formData();
+      const key = form.get("idempotency_key");
+      if (key) {
+        headers["idempotency-key"] = key;
+      }
+    } catch (error) {
+      // Not a form body.
+    }
+  }
+  await outboxTransaction("readwrite", (store) =>
+    store.add({ url: request.url, method: request.method, headers, body, queuedAt: Date.now() })
+  );
+  if (self.registration.sync) {
+    try {
+      await self.registration.sync.register(SYNC_TAG);
+    } catch (error) {
+      // Background Sync unavailable; pages ask for a replay when back online.
+    }
+  }
+};
+
+let replaying = null;
+
+const describeEntry = (entry) => {
+  const path = new URL(entry.url).pathname;
+  if (path.endsWith("/ring")) {
+    return "ring";
+  }
+  return path.endsWith("/cancel") ? "cancellation" : "order";
+};
+
+const readError = async (response) => {
+  try {
+    const payload = await response.json();
+    return payload.error || `status ${response.status}`;
+  } catch (error) {
+    return `status ${response.status}`;
+  }
+};
+
+const notifyRejected = async (entry, error) => {
+  const clients = await self.clients.matchAll({ type: "window", includeUncontrolled: true });
+  clients.forEach((client) => {
+    client.postMessage({ type: "replay-rejected", kind: describeEntry(entry), error });
+  });
+};
+
+const replayOutbox = async () => {
+  const entries = (await outboxTransaction("readonly", (store) => store.getAll())) || [];
+  for (const entry of entries) {
+    if (Date.now() - (entry.queuedAt || 0) > OUTBOX_TTL_MS) {
+      await outboxTransaction("readwrite", (store) => store.delete(entry.id));
+      await notifyRejected(entry, "it was saved offline more than 12 hours ago");
+      continue;
+    }
+    // A network error here rejects the replay, keeping the entry queued for the next sync.
+    const response = await fetch(entry.url, {
+      method: entry.method,
+      headers: entry.headers,
+      body: entry.body,
+      credentials: "same-origin",
+      redirect: "manual",
+    });
+    if (response.status === 429 || response.status >= 500) {
+      throw new Error(`Replay deferred (${response.status})`);
+    }
+    await outboxTransaction("readwrite", (store) => store.delete(entry.id));
+    // Redirects come back opaque (status 0) and mean the order was placed.
+    if (response.type !== "opaqueredirect" && !response.ok) {
+      await notifyRejected(entry, await readError(response));
+    }
+  }
+};
+
+const replayOnce = () => {
+  if (!replaying) {
+    replaying = replayOutbox().finally(() => {
+      replaying = null;
+    });
+  }
+  return replaying;
+};
+
+const handleQueueablePost = async (request) => {
+  const copy = request.clone();
+  try {
+    return await fetch(request);
+  } catch (error) {
+    await enqueueRequest(copy);
+    if (request.mode === "navigate") {
+      const queuedPage = await caches.match("/static/queued.html");
+      if (queuedPage) {
+        return queuedPage;
+      }
+    }
+    return new Response(JSON.stringify({ queued: true }), {
+      status: 202,
+      headers: { "Content-Type": "application/json" },
+    });
+  }
+};
 
 self.addEventListener("install", (event) => {
   event.waitUntil(caches.open(CACHE_NAME).then((cache) => cache.addAll(ASSETS)));
@@ -24,7 +179,30 @@ self.addEventListener("activate", (event) => {
   );
 });
 
+self.addEventListener("sync", (event) => {
+  if (event.tag === SYNC_TAG) {
+    event.waitUntil(replayOnce());
+  }
+});
+
+self.addEventListener("message", (event) => {
+  if (event.data === "replay-outbox") {
+    event.waitUntil(replayOnce().catch(() => {}));
+  }
+});
+
+const isCacheableAsset = (path) =>
+  (path.startsWith("/static/") && !path.startsWith("/static/voice/")) ||
+  path.startsWith("/menu-images/");
+
 self.addEventListener("fetch", (event) => {
+  const path = new URL(event.request.url).pathname;
+  if (event.request.method === "POST") {
+    if (QUEUEABLE_PATHS.some((pattern) => pattern.test(path))) {
+      event.respondWith(handleQueueablePost(event.request));
+    }
+    return;
+  }
   if (event.request.method !== "GET") {
     return;
   }
@@ -34,18 +212,19 @@ self.addEventListener("fetch", (event) => {
     );
     return;
   }
+  // API polls always hit the network; static assets fall back to the cache offline.
+  if (!isCacheableAsset(path)) {
+    return;
+  }
   event.respondWith(
-    caches.match(event.request).then((cached) => {
-      if (cached) {
-        return cached;
-      }
-      return fetch(event.request).then((response) => {
+    fetch(event.request)
+      .then((response) => {
         if (response.status === 200 && response.type === "basic") {
           const copy = response.clone();
           caches.open(CACHE_NAME).then((cache) => cache.put(event.request, copy));
         }
         return response;
-      });
-    })
+      })
+      .catch(() => caches.match(event.request))
   );
 });